@@ -0,0 +1,14 @@
+"""
+_bootstrap.py — Shared setup for the one-off maintenance scripts.
+Puts the project directory on sys.path and loads its .env once.
+"""
+
+import sys
+from pathlib import Path
+
+from dotenv import load_dotenv
+
+ROOT = Path(__file__).resolve().parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+load_dotenv(ROOT / ".env")
@@ -3,18 +3,36 @@ ai_agent.py — Gemini AI integration for content optimization.
 Sends video metadata to Gemini and validates the JSON response.
 """
 
+import asyncio
+import atexit
+import functools
+import hashlib
 import json
 import logging
+import queue
 import re
-from datetime import datetime, timezone
-from typing import Any
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Annotated, Any, Literal
 
 import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
 
 import config
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Bump whenever SYSTEM_PROMPT changes so cached responses are invalidated.
+PROMPT_VERSION = "v1"
+
 # ── System prompt (from user specification) ───────────────────────
 SYSTEM_PROMPT = """You are a content optimization assistant for short-form video reposting. Your job: given metadata of a short video (source URL, original title, duration, view_count, thumbnail_url, source_channel, language_hint), generate professional, SEO-oriented, ENGLISH-ONLY outputs that will be used to upload the video to destination channels. Strict rules:
 
@@ -87,9 +105,151 @@ REQUIRED JSON SCHEMA (you must return EXACTLY this JSON object):
 }"""
 
 
+_GENAI_CONFIGURED = False
+_GENAI_LOCK = threading.Lock()
+
+
 def _configure_genai():
-    """Configure the Gemini SDK with the API key."""
-    genai.configure(api_key=config.GEMINI_API_KEY)
+    """
+    Configure the Gemini SDK with the API key (once per process).
+    configure() discards the SDK's cached clients, so calling it only once
+    is what lets every request reuse the same open connection.
+    """
+    global _GENAI_CONFIGURED
+    if _GENAI_CONFIGURED:
+        return
+    with _GENAI_LOCK:
+        if not _GENAI_CONFIGURED:
+            genai.configure(api_key=config.GEMINI_API_KEY, transport=config.GEMINI_TRANSPORT)
+            _GENAI_CONFIGURED = True
+
+
+# ── Context cache for SYSTEM_PROMPT ───────────────────────────────
+# Refresh the cache this long before the server-side TTL runs out.
+_CACHE_REFRESH_MARGIN = timedelta(minutes=5)
+# After a transient cache creation error, send the prompt inline this long
+# before trying to create the cache again.
+_CACHE_RETRY_SECONDS = 60.0
+
+_CACHED_SYSTEM = None
+_CACHE_UNAVAILABLE = False
+_CACHE_RETRY_AT = 0.0  # time.monotonic() before which creation is not retried
+_CACHE_LOCK = threading.Lock()
+_MODELS: dict[tuple[str, str], Any] = {}
+
+
+def _generation_config():
+    return genai.GenerationConfig(
+        temperature=config.GEMINI_TEMPERATURE,
+        max_output_tokens=config.GEMINI_MAX_TOKENS,
+    )
+
+
+def _get_cached_system():
+    """
+    Return the CachedContent holding SYSTEM_PROMPT, creating or refreshing it
+    as needed. Returns None when caching is disabled, the API refused it,
+    or creation failed transiently less than _CACHE_RETRY_SECONDS ago.
+    """
+    global _CACHED_SYSTEM, _CACHE_UNAVAILABLE, _CACHE_RETRY_AT
+    if not config.GEMINI_CONTEXT_CACHE or _CACHE_UNAVAILABLE:
+        return None
+    if _CACHED_SYSTEM is None and time.monotonic() < _CACHE_RETRY_AT:
+        return None
+
+    with _CACHE_LOCK:
+        cached = _CACHED_SYSTEM
+        if cached is not None:
+            expire_time = cached.expire_time
+            if expire_time.tzinfo is None:
+                expire_time = expire_time.replace(tzinfo=timezone.utc)
+            if expire_time - datetime.now(timezone.utc) > _CACHE_REFRESH_MARGIN:
+                return cached
+            _drop_cached_system_locked()
+
+        try:
+            _CACHED_SYSTEM = genai.caching.CachedContent.create(
+                model=config.GEMINI_MODEL,
+                system_instruction=SYSTEM_PROMPT,
+                ttl=timedelta(seconds=config.GEMINI_CACHE_TTL_SECONDS),
+            )
+        except google_exceptions.InvalidArgument as e:
+            # Typically the prompt is below the model's minimum cacheable
+            # size; send it inline for the rest of this process.
+            logger.warning("Context cache unavailable, sending system prompt inline: %s", e)
+            _CACHE_UNAVAILABLE = True
+            return None
+        except google_exceptions.GoogleAPIError as e:
+            # Outages, timeouts and quota errors pass; retry after a pause.
+            logger.warning(
+                "Context cache creation failed, sending system prompt inline for %.0fs: %s",
+                _CACHE_RETRY_SECONDS, e,
+            )
+            _CACHE_RETRY_AT = time.monotonic() + _CACHE_RETRY_SECONDS
+            return None
+
+        logger.info("Created Gemini context cache %s", _CACHED_SYSTEM.name)
+        return _CACHED_SYSTEM
+
+
+def _drop_cached_system_locked():
+    """Forget the current context cache and any models bound to it."""
+    global _CACHED_SYSTEM
+    if _CACHED_SYSTEM is None:
+        return
+    name = _CACHED_SYSTEM.name
+    _CACHED_SYSTEM = None
+    for key in [k for k in _MODELS if k[1] == name]:
+        del _MODELS[key]
+
+
+def _invalidate_cached_system():
+    with _CACHE_LOCK:
+        _drop_cached_system_locked()
+
+
+def _get_model():
+    """
+    Return the GenerativeModel for the current (model, cache) pair.
+    Built once and shared across rows; generation settings are passed
+    per request via _generation_config().
+    """
+    _configure_genai()
+    cached = _get_cached_system()
+    key = (config.GEMINI_MODEL, cached.name if cached is not None else "")
+    model = _MODELS.get(key)
+    if model is not None:
+        return model
+
+    with _GENAI_LOCK:
+        model = _MODELS.get(key)
+        if model is None:
+            if cached is not None:
+                model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+            else:
+                model = genai.GenerativeModel(
+                    model_name=config.GEMINI_MODEL,
+                    system_instruction=SYSTEM_PROMPT,
+                )
+            _MODELS[key] = model
+    return model
+
+
+_USER_MESSAGE_PREFIX = (
+    "Here is the source row data. Respond ONLY with the JSON described "
+    "in the system message.\n\n"
+)
+_USER_MESSAGE_PREFIX_BYTES = _USER_MESSAGE_PREFIX.encode("utf-8")
+
+
+@functools.lru_cache(maxsize=256)
+def _render_user_message(items: tuple) -> str:
+    """Serialize payload items; memoized so retries of a row reuse the text."""
+    payload = dict(items)
+    if orjson is not None:
+        body = orjson.dumps(payload, option=orjson.OPT_INDENT_2)
+        return (_USER_MESSAGE_PREFIX_BYTES + body).decode("utf-8")
+    return _USER_MESSAGE_PREFIX + json.dumps(payload, indent=2)
 
 
 def _build_user_message(row_data: dict[str, Any]) -> str:
@@ -106,17 +266,28 @@ def _build_user_message(row_data: dict[str, Any]) -> str:
         "content_hash": row_data.get("content_hash", ""),
         "language_hint": row_data.get("language_hint", "unknown"),
     }
-    return (
-        "Here is the source row data. Respond ONLY with the JSON described "
-        "in the system message.\n\n" + json.dumps(payload, indent=2)
-    )
+    items = tuple(payload.items())
+    try:
+        return _render_user_message(items)
+    except TypeError:
+        # Unhashable cell value; serialize without the cache
+        return _render_user_message.__wrapped__(items)
 
 
 def _safe_int(val) -> int:
     """Convert a value to int safely, defaulting to 0."""
+    if type(val) is int:
+        return val
+    if val is None or val == "":
+        return 0
     try:
+        if isinstance(val, float):
+            return int(val)
+        # Plain integer strings skip the float round-trip
+        if isinstance(val, str) and val.lstrip("-").isdigit():
+            return int(val)
         return int(float(val))
-    except (ValueError, TypeError):
+    except (ValueError, TypeError, OverflowError):
         return 0
 
 
@@ -149,47 +320,107 @@ VALID_CATEGORIES = {
 }
 
 
+# \Z rather than $ so a trailing newline is not accepted.
+HASHTAG_PATTERN = r"^#[A-Za-z0-9_]+\Z"
+_HASHTAG_RE = re.compile(HASHTAG_PATTERN)
+
+
 def _contains_non_ascii(text: str) -> bool:
     """Check if text contains non-ASCII characters (excluding common punctuation)."""
+    return not text.isascii()
+
+
+class AIResponse(BaseModel):
+    """
+    Strict model of a well-formed response, equivalent to the checks in
+    _collect_issues. Only used as a fast accept: anything it rejects goes
+    through the detailed checks for readable issues and int coercion.
+    """
+
+    # python-re so HASHTAG_PATTERN's \Z anchor behaves as in _collect_issues;
+    # extra="allow" keeps any additional keys the model returned.
+    model_config = ConfigDict(strict=True, extra="allow", regex_engine="python-re")
+
+    agent_version: str
+    row_id: int
+    ai_title: Annotated[str, Field(max_length=60)]
+    ai_description: Annotated[str, Field(min_length=100, max_length=400)]
+    ai_hashtags: Annotated[
+        list[Annotated[str, Field(pattern=HASHTAG_PATTERN)]],
+        Field(min_length=8, max_length=15),
+    ]
+    ai_hashtags_csv: str
+    ai_tags: str
+    category: Literal[tuple(sorted(VALID_CATEGORIES))]
+    priority_score: Annotated[int, Field(ge=0, le=100)]
+    priority_reason: str
+    suggested_ffmpeg_cmd: str | None
+    ffmpeg_reason: str | None
+    flagged_for_review: bool
+    review_reasons: list
+    notes: str | None
+    content_hash: str
+    output_language: Literal["en"]
+    timestamp_utc: str
+
+
+def _passes_schema(data: dict[str, Any]) -> bool:
     try:
-        text.encode("ascii")
+        AIResponse.model_validate(data)
+    except ValidationError:
         return False
-    except UnicodeEncodeError:
-        return True
+    return True
 
 
-def validate_response(data: dict[str, Any]) -> tuple[bool, list[str]]:
+def _parse_validated(text: str) -> dict[str, Any] | None:
     """
-    Validate the AI response against the required schema.
-    Returns (is_valid, list_of_issues).
+    Parse and validate JSON text in a single pydantic-core pass.
+    Returns None if the response needs the detailed path (or is not JSON).
     """
+    try:
+        return AIResponse.model_validate_json(text).model_dump()
+    except ValidationError:
+        return None
+
+
+_MISSING = object()
+
+# (field, isinstance target, coerce-to-int, expected-type text), built once
+# from REQUIRED_FIELDS so the per-response loop does no type introspection.
+_FIELD_CHECKS = tuple(
+    (
+        field,
+        expected_type,
+        expected_type is int,
+        f"one of {[t.__name__ for t in expected_type]}"
+        if isinstance(expected_type, tuple) else expected_type.__name__,
+    )
+    for field, expected_type in REQUIRED_FIELDS.items()
+)
+
+
+def _collect_issues(data: dict[str, Any]) -> list[str]:
+    """Run the detailed field checks, coercing numeric strings in place."""
     issues = []
 
     # Check required fields exist and have correct types
-    for field, expected_type in REQUIRED_FIELDS.items():
-        if field not in data:
+    for field, expected_type, coerce_int, expected_desc in _FIELD_CHECKS:
+        val = data.get(field, _MISSING)
+        if val is _MISSING:
             issues.append(f"Missing field: {field}")
             continue
-        val = data[field]
-        if isinstance(expected_type, tuple):
-            if not isinstance(val, expected_type):
-                issues.append(
-                    f"Field '{field}' has type {type(val).__name__}, "
-                    f"expected one of {[t.__name__ for t in expected_type]}"
-                )
+        if isinstance(val, expected_type):
+            continue
+        # Allow int/float coercion for numeric fields
+        if coerce_int and isinstance(val, (float, str)):
+            try:
+                data[field] = int(float(val))
+            except (ValueError, TypeError, OverflowError):
+                issues.append(f"Field '{field}' cannot be converted to int")
         else:
-            if not isinstance(val, expected_type):
-                # Allow int/float coercion for numeric fields
-                if expected_type == int and isinstance(val, (float, str)):
-                    try:
-                        data[field] = int(float(val))
-                    except (ValueError, TypeError):
-                        issues.append(f"Field '{field}' cannot be converted to int")
-                else:
-                    issues.append(
-                        f"Field '{field}' has type {type(val).__name__}, "
-                        f"expected {expected_type.__name__}"
-                    )
+            issues.append(
+                f"Field '{field}' has type {type(val).__name__}, expected {expected_desc}"
+            )
 
     # Title length
     title = data.get("ai_title", "")
@@ -211,9 +442,11 @@ def validate_response(data: dict[str, Any]) -> tuple[bool, list[str]]:
             issues.append(f"Too few hashtags ({len(hashtags)}, min 8)")
         if len(hashtags) > 15:
             issues.append(f"Too many hashtags ({len(hashtags)}, max 15)")
-        for tag in hashtags:
-            if isinstance(tag, str) and not re.match(r"^#[A-Za-z0-9_]+$", tag):
-                issues.append(f"Invalid hashtag format: {tag}")
+        issues.extend(
+            f"Invalid hashtag format: {tag}"
+            for tag in hashtags
+            if isinstance(tag, str) and not _HASHTAG_RE.match(tag)
+        )
 
     # Category
     cat = data.get("category", "")
@@ -225,7 +458,15 @@ def validate_response(data: dict[str, Any]) -> tuple[bool, list[str]]:
     if isinstance(score, (int, float)) and not (0 <= score <= 100):
         issues.append(f"priority_score out of range: {score}")
 
-    # Non-ASCII check on text fields
+    # Output language must be "en"
+    if data.get("output_language") != "en":
+        issues.append(f"output_language is '{data.get('output_language')}', expected 'en'")
+
+    return issues
+
+
+def _flag_non_ascii(data: dict[str, Any], issues: list[str]):
+    """Record non-ASCII text fields as issues and flag the row for review."""
     for text_field in ["ai_title", "ai_description", "ai_tags", "ai_hashtags_csv"]:
         val = data.get(text_field, "")
         if isinstance(val, str) and _contains_non_ascii(val):
@@ -235,18 +476,22 @@ def validate_response(data: dict[str, Any]) -> tuple[bool, list[str]]:
                 data["review_reasons"] = []
             data["review_reasons"].append(f"Non-ASCII detected in {text_field}")
 
-    # Output language must be "en"
-    if data.get("output_language") != "en":
-        issues.append(f"output_language is '{data.get('output_language')}', expected 'en'")
+
+def validate_response(data: dict[str, Any]) -> tuple[bool, list[str]]:
+    """
+    Validate the AI response against the required schema.
+    Returns (is_valid, list_of_issues).
+    """
+    issues = [] if _passes_schema(data) else _collect_issues(data)
+    _flag_non_ascii(data, issues)
 
     is_valid = len(issues) == 0
     return is_valid, issues
 
 
-def _extract_json(text: str) -> dict[str, Any]:
-    """Extract JSON from model response text, handling markdown fences."""
+def _strip_code_fences(text: str) -> str:
+    """Remove surrounding markdown code fences from model response text."""
     text = text.strip()
-    # Remove markdown code fences if present
     if text.startswith("```"):
         # Remove first line (```json or ```)
         lines = text.split("\n")
@@ -254,49 +499,172 @@ def _extract_json(text: str) -> dict[str, Any]:
         if lines and lines[-1].strip() == "```":
             lines = lines[:-1]  # drop closing fence
         text = "\n".join(lines).strip()
+    return text
+
+
+def _extract_json(text: str) -> dict[str, Any]:
+    """Extract JSON from model response text, handling markdown fences."""
+    text = _strip_code_fences(text)
+    # orjson.JSONDecodeError subclasses json.JSONDecodeError, so callers
+    # catch the same exception either way.
+    if orjson is not None:
+        return orjson.loads(text)
     return json.loads(text)
 
 
-# ── Main processing function ─────────────────────────────────────
+# ── Response cache ────────────────────────────────────────────────
+# Validated results keyed by (model, prompt version, content hash, title),
+# so re-running a sheet does not re-query Gemini for unchanged rows.
+
+_RESPONSE_CACHE_READY = False
+
+
+def _response_cache_conn() -> sqlite3.Connection:
+    global _RESPONSE_CACHE_READY
+    conn = sqlite3.connect(str(config.AI_CACHE_DB), timeout=10)
+    if not _RESPONSE_CACHE_READY:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS ai_responses (
+                   cache_key TEXT PRIMARY KEY,
+                   result_json TEXT NOT NULL,
+                   expires_at REAL NOT NULL
+               )"""
+        )
+        conn.commit()
+        _RESPONSE_CACHE_READY = True
+    return conn
+
+
+def _response_cache_key(row_data: dict[str, Any]) -> str | None:
+    """Return the cache key for a row, or None if it has no content hash."""
+    content_hash = str(row_data.get("content_hash", "") or "").strip()
+    if not config.AI_CACHE_ENABLED or not content_hash:
+        return None
+    raw = "|".join((
+        config.GEMINI_MODEL,
+        PROMPT_VERSION,
+        content_hash,
+        str(row_data.get("original_title", "") or ""),
+    ))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=20).hexdigest()
+
+
+def _response_cache_get(row_data: dict[str, Any]) -> dict[str, Any] | None:
+    key = _response_cache_key(row_data)
+    if key is None:
+        return None
+    try:
+        conn = _response_cache_conn()
+        try:
+            row = conn.execute(
+                "SELECT result_json FROM ai_responses WHERE cache_key = ? AND expires_at > ?",
+                (key, time.time()),
+            ).fetchone()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning("AI response cache read failed: %s", e)
+        return None
+    if not row:
+        return None
+    result = json.loads(row[0])
+    # The same content may sit under a different row_id this time.
+    result["row_id"] = _safe_int(row_data.get("row_id", 0))
+    logger.info("AI cache hit for row %s", row_data.get("row_id", "?"))
+    return result
 
-def process_row(row_data: dict[str, Any]) -> dict[str, Any]:
-    """
-    Process a single row through Gemini and return validated output.
-    Raises ValueError on unrecoverable errors.
-    """
-    _configure_genai()
 
-    model = genai.GenerativeModel(
-        model_name=config.GEMINI_MODEL,
-        system_instruction=SYSTEM_PROMPT,
-        generation_config=genai.GenerationConfig(
-            temperature=config.GEMINI_TEMPERATURE,
-            max_output_tokens=config.GEMINI_MAX_TOKENS,
-        ),
-    )
+def _response_cache_set(row_data: dict[str, Any], result: dict[str, Any]):
+    key = _response_cache_key(row_data)
+    if key is None:
+        return
+    try:
+        conn = _response_cache_conn()
+        try:
+            conn.execute(
+                "INSERT OR REPLACE INTO ai_responses (cache_key, result_json, expires_at) VALUES (?, ?, ?)",
+                (key, json.dumps(result), time.time() + config.AI_CACHE_TTL_SECONDS),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning("AI response cache write failed: %s", e)
+
+
+# ── Raw response log writer ───────────────────────────────────────
+# Raw responses are written by a daemon thread so disk latency never sits
+# between two Gemini calls. Pending writes are flushed at interpreter exit.
+
+_RAW_LOG_STOP = object()
+_raw_log_queue: queue.SimpleQueue = queue.SimpleQueue()
+_raw_log_thread: threading.Thread | None = None
+_raw_log_lock = threading.Lock()
+
+
+def _raw_log_worker():
+    while True:
+        item = _raw_log_queue.get()
+        if item is _RAW_LOG_STOP:
+            return
+        log_file, raw_text = item
+        try:
+            log_file.write_text(raw_text, encoding="utf-8")
+            logger.info("Logged raw response to %s", log_file)
+        except OSError as e:
+            logger.warning("Failed to log raw response to %s: %s", log_file, e)
+
+
+def _flush_raw_log():
+    thread = _raw_log_thread
+    if thread is not None and thread.is_alive():
+        _raw_log_queue.put(_RAW_LOG_STOP)
+        thread.join(timeout=5)
+
+
+def _log_raw_response(log_file, raw_text: str):
+    """Queue a raw response for the background writer."""
+    global _raw_log_thread
+    if _raw_log_thread is None:
+        with _raw_log_lock:
+            if _raw_log_thread is None:
+                thread = threading.Thread(target=_raw_log_worker, name="ai-raw-log", daemon=True)
+                thread.start()
+                atexit.register(_flush_raw_log)
+                _raw_log_thread = thread
+    _raw_log_queue.put((log_file, raw_text))
 
-    user_msg = _build_user_message(row_data)
-    logger.info("Sending row %s to Gemini...", row_data.get("row_id", "?"))
 
-    response = model.generate_content(user_msg)
+# ── Main processing function ─────────────────────────────────────
 
-    raw_text = response.text
+def _finalize_response(row_data: dict[str, Any], raw_text: str) -> dict[str, Any]:
+    """
+    Log, parse and validate a raw Gemini response for one row.
+    Clean results are stored in the response cache.
+    """
     logger.debug("Raw Gemini response: %s", raw_text[:500])
 
     # Log raw response to file
     row_id = row_data.get("row_id", "unknown")
-    log_file = config.LOG_DIR / f"row_{row_id}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.json"
-    log_file.write_text(raw_text, encoding="utf-8")
-    logger.info("Logged raw response to %s", log_file)
-
-    # Parse JSON
-    try:
-        result = _extract_json(raw_text)
-    except json.JSONDecodeError as e:
-        raise ValueError(f"Failed to parse model JSON: {e}\nRaw: {raw_text[:300]}")
-
-    # Validate
-    is_valid, issues = validate_response(result)
+    now = datetime.now(timezone.utc)
+    log_file = config.LOG_DIR / f"row_{row_id}_{now:%Y%m%d_%H%M%S}.json"
+    _log_raw_response(log_file, raw_text)
+
+    # Parse and validate; clean responses take a single pydantic pass
+    json_text = _strip_code_fences(raw_text)
+    result = _parse_validated(json_text)
+    if result is not None:
+        issues = []
+        _flag_non_ascii(result, issues)
+    else:
+        try:
+            result = _extract_json(json_text)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Failed to parse model JSON: {e}\nRaw: {raw_text[:300]}")
+        _, issues = validate_response(result)
+
+    is_valid = not issues
     if not is_valid:
         logger.warning("Validation issues for row %s: %s", row_id, issues)
         # For non-critical issues (like char limits), still proceed but add notes
@@ -307,6 +675,91 @@ def process_row(row_data: dict[str, Any]) -> dict[str, Any]:
 
     # Ensure timestamp
     if not result.get("timestamp_utc"):
-        result["timestamp_utc"] = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+        result["timestamp_utc"] = now.isoformat(timespec="seconds").replace("+00:00", "Z")
+
+    # Only cache clean results so a re-run can still improve flawed ones
+    if is_valid:
+        _response_cache_set(row_data, result)
 
     return result
+
+
+def process_row(row_data: dict[str, Any]) -> dict[str, Any]:
+    """
+    Process a single row through Gemini and return validated output.
+    Raises ValueError on unrecoverable errors.
+    """
+    cached = _response_cache_get(row_data)
+    if cached is not None:
+        return cached
+
+    user_msg = _build_user_message(row_data)
+    logger.info("Sending row %s to Gemini...", row_data.get("row_id", "?"))
+
+    generation_config = _generation_config()
+    try:
+        response = _get_model().generate_content(
+            user_msg, generation_config=generation_config,
+        )
+    except (google_exceptions.NotFound, google_exceptions.PermissionDenied):
+        if _CACHED_SYSTEM is None:
+            raise
+        # Cache expired or was deleted server-side: recreate and retry once.
+        logger.info("Gemini context cache rejected, recreating it")
+        _invalidate_cached_system()
+        response = _get_model().generate_content(
+            user_msg, generation_config=generation_config,
+        )
+
+    return _finalize_response(row_data, response.text)
+
+
+async def process_row_async(row_data: dict[str, Any]) -> dict[str, Any]:
+    """Async variant of process_row using the SDK's non-blocking client."""
+    # The response cache is synchronous sqlite (the first call also creates
+    # the DB); keep it off the event loop so other rows' requests keep going.
+    cached = await asyncio.to_thread(_response_cache_get, row_data)
+    if cached is not None:
+        return cached
+
+    user_msg = _build_user_message(row_data)
+    logger.info("Sending row %s to Gemini...", row_data.get("row_id", "?"))
+
+    generation_config = _generation_config()
+    # _get_model may create the Gemini context cache (a blocking API call)
+    # on first use and after the recreate below, so resolve it in a thread.
+    model = await asyncio.to_thread(_get_model)
+    try:
+        response = await model.generate_content_async(
+            user_msg, generation_config=generation_config,
+        )
+    except (google_exceptions.NotFound, google_exceptions.PermissionDenied):
+        if _CACHED_SYSTEM is None:
+            raise
+        logger.info("Gemini context cache rejected, recreating it")
+        _invalidate_cached_system()
+        model = await asyncio.to_thread(_get_model)
+        response = await model.generate_content_async(
+            user_msg, generation_config=generation_config,
+        )
+
+    # Writes the validated result to the response cache
+    return await asyncio.to_thread(_finalize_response, row_data, response.text)
+
+
+async def process_rows(
+    rows: list[dict[str, Any]],
+    concurrency: int = config.RATE_LIMIT_RPS,
+) -> list[dict[str, Any] | BaseException]:
+    """
+    Process many rows concurrently, with at most `concurrency` Gemini calls
+    in flight. Results are returned in input order; a failed row yields its
+    exception instead of a dict so one bad row does not cancel the rest.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _run(row: dict[str, Any]) -> dict[str, Any]:
+        async with semaphore:
+            return await process_row_async(row)
+
+    return await asyncio.gather(*(_run(row) for row in rows), return_exceptions=True)
@@ -6,22 +6,27 @@ from datetime import datetime
 from pathlib import Path
 import fcntl
 
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
 
 REPO_DIR = Path(__file__).resolve().parent
 LOG_FILE = REPO_DIR / "logs" / "auto_commit.log"
 LOCK_FILE = Path("/tmp/gravix_autocommit.lock")
 POLL_SECONDS = 3600
+DEBOUNCE_SECONDS = 60
+WATCH_TIMEOUT_MS = 30_000
+EXCLUDE_DIRS = {".git", "venv", ".venv", "logs", "__pycache__", "backups", "secrets"}
+
+LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
 
 
 def _log(msg: str):
-    LOG_FILE.parent.mkdir(parents=True, exist_ok=True)
     ts = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    line = f"[{ts}] {msg}\n"
-    if not LOG_FILE.exists():
-        LOG_FILE.write_text(line, encoding="utf-8")
-        return
     with LOG_FILE.open("a", encoding="utf-8") as f:
-        f.write(line)
+        f.write(f"[{ts}] {msg}\n")
 
 
 def _run(cmd: list[str]) -> subprocess.CompletedProcess:
@@ -42,6 +47,68 @@ def _commit_and_push():
     _run(["git", "push", "origin", "main"])
 
 
+def _sync():
+    try:
+        if _has_changes():
+            _commit_and_push()
+    except Exception as e:
+        _log(f"error: {e}")
+
+
+def _add_watches(inotify, root: Path, wds: dict, mask):
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = [d for d in dirnames if d not in EXCLUDE_DIRS]
+        try:
+            wd = inotify.add_watch(dirpath, mask)
+        except OSError:
+            continue
+        wds[wd] = Path(dirpath)
+
+
+def _watch_loop():
+    """
+    Commit DEBOUNCE_SECONDS after the last filesystem change under REPO_DIR,
+    or at most POLL_SECONDS after the first one.
+    """
+    inotify = INotify()
+    mask = flags.MODIFY | flags.CLOSE_WRITE | flags.CREATE | flags.DELETE | flags.MOVED_TO | flags.MOVED_FROM
+    wds: dict[int, Path] = {}
+    _add_watches(inotify, REPO_DIR, wds, mask)
+
+    _log(f"auto-commit watcher started (inotify, {len(wds)} dirs)")
+    _sync()
+    first_event = last_event = None
+    while True:
+        events = inotify.read(timeout=WATCH_TIMEOUT_MS)
+        for event in events:
+            if event.mask & flags.IGNORED:
+                wds.pop(event.wd, None)
+                continue
+            # Newly created directories need their own watch
+            if event.mask & flags.ISDIR and event.mask & (flags.CREATE | flags.MOVED_TO):
+                parent = wds.get(event.wd)
+                if parent is not None and event.name not in EXCLUDE_DIRS:
+                    _add_watches(inotify, parent / event.name, wds, mask)
+        now = time.monotonic()
+        if events:
+            last_event = now
+            if first_event is None:
+                first_event = now
+        if last_event is None:
+            continue
+        # Files that never go quiet (e.g. queue.db) must not starve commits
+        if now - last_event >= DEBOUNCE_SECONDS or now - first_event >= POLL_SECONDS:
+            first_event = last_event = None
+            _sync()
+
+
+def _poll_loop():
+    _log("auto-commit watcher started (hourly)")
+    while True:
+        _sync()
+        time.sleep(POLL_SECONDS)
+
+
 def main():
     with LOCK_FILE.open("w") as f:
         try:
@@ -49,14 +116,12 @@ def main():
         except OSError:
             return
 
-        _log("auto-commit watcher started (hourly)")
-        while True:
+        if INotify is not None:
             try:
-                if _has_changes():
-                    _commit_and_push()
-            except Exception as e:
-                _log(f"error: {e}")
-            time.sleep(POLL_SECONDS)
+                _watch_loop()
+            except OSError as e:
+                _log(f"inotify unavailable ({e}); falling back to polling")
+        _poll_loop()
 
 
 if __name__ == "__main__":
@@ -18,9 +18,17 @@ echo "[$(date -u)] Starting Gravix backup..."
 # Build file list
 FILES_TO_BACKUP=""
 
-# Credentials (if exists)
+# Credentials (if exists). Account changes may still sit in the write-ahead
+# log, so fold it into the snapshot first; the log and pending OAuth states
+# are archived too in case compaction fails.
 if [ -f "${SCRIPT_DIR}/secrets/credentials.json" ]; then
-    FILES_TO_BACKUP="${FILES_TO_BACKUP} secrets/credentials.json"
+    (cd "${SCRIPT_DIR}" && python3 -c 'import oauth_helper; oauth_helper.compact_credentials()') \
+        || echo "[$(date -u)] WARNING: Credentials compaction failed; archiving the log as is."
+    for f in credentials.json credentials.wal credentials.states.jsonl; do
+        if [ -f "${SCRIPT_DIR}/secrets/${f}" ]; then
+            FILES_TO_BACKUP="${FILES_TO_BACKUP} secrets/${f}"
+        fi
+    done
 fi
 
 # Queue DB (if exists)
@@ -8,39 +8,72 @@ creds = Credentials.from_service_account_file(scraper_config.GOOGLE_SVC_JSON, sc
 service = build('sheets', 'v4', credentials=creds)
 sheets = service.spreadsheets()
 
-# 1. Clear source__apna_scenario
-try:
-    # Clear range A2:Z
-    sheets.values().clear(
-        spreadsheetId=scraper_config.SPREADSHEET_ID,
-        range="source__apna_scenario!A2:Z"
-    ).execute()
-    print("✅ Cleared source__apna_scenario content (kept header)")
-except Exception as e:
-    print(f"⚠️ Failed to clear tab: {e}")
+SOURCE_TAB = "source__apna_scenario"
 
-# 2. Reset master_index
+# 1. One read: sheet ids for every tab plus the master_index values
 try:
-    result = sheets.values().get(
+    meta = sheets.get(
         spreadsheetId=scraper_config.SPREADSHEET_ID,
-        range="'master_index'!A:F"
+        ranges=["'master_index'!A:F"],
+        includeGridData=True,
+        fields="sheets(properties(sheetId,title),data(rowData(values(formattedValue))))",
     ).execute()
-    rows = result.get("values", [])
-    
-    for i, row in enumerate(rows):
-        if i == 0: continue
-        if row and row[0] == "source__apna_scenario":
-            # Update row i+1
-            # Reset LastScraped(D) -> "", VideoCount(E) -> "0", Status(F) -> "ACTIVE"
-            # In A1 notation: D{i+1}:F{i+1}
-            range_name = f"'master_index'!D{i+1}:F{i+1}"
-            sheets.values().update(
-                spreadsheetId=scraper_config.SPREADSHEET_ID,
-                range=range_name,
-                valueInputOption="RAW",
-                body={"values": [["", "0", "ACTIVE"]]}
-            ).execute()
-            print(f"✅ Reset master_index row {i+1} for source__apna_scenario")
-            break
 except Exception as e:
-    print(f"❌ Failed to update master_index: {e}")
+    print(f"❌ Failed to read spreadsheet: {e}")
+    raise SystemExit(1)
+
+sheet_ids = {s["properties"]["title"]: s["properties"]["sheetId"] for s in meta.get("sheets", [])}
+master_rows = []
+for s in meta.get("sheets", []):
+    if s["properties"]["title"] == "master_index":
+        for grid in s.get("data", []):
+            for row_data in grid.get("rowData", []):
+                master_rows.append([c.get("formattedValue", "") for c in row_data.get("values", [])])
+
+requests = []
+
+# Clear source__apna_scenario from row 2 down (keep header)
+if SOURCE_TAB in sheet_ids:
+    requests.append({
+        "updateCells": {
+            "range": {"sheetId": sheet_ids[SOURCE_TAB], "startRowIndex": 1},
+            "fields": "userEnteredValue",
+        }
+    })
+else:
+    print(f"⚠️ Tab {SOURCE_TAB} not found — nothing to clear")
+
+# Reset LastScraped(D) -> "", VideoCount(E) -> "0", Status(F) -> "ACTIVE"
+master_row = None
+for i, row in enumerate(master_rows):
+    if i == 0: continue
+    if row and row[0] == SOURCE_TAB:
+        master_row = i
+        requests.append({
+            "updateCells": {
+                "range": {
+                    "sheetId": sheet_ids["master_index"],
+                    "startRowIndex": i, "endRowIndex": i + 1,
+                    "startColumnIndex": 3, "endColumnIndex": 6,
+                },
+                "rows": [{"values": [
+                    {"userEnteredValue": {"stringValue": v}} for v in ("", "0", "ACTIVE")
+                ]}],
+                "fields": "userEnteredValue",
+            }
+        })
+        break
+
+# 2. One write: clear + reset applied atomically
+if requests:
+    try:
+        sheets.batchUpdate(
+            spreadsheetId=scraper_config.SPREADSHEET_ID,
+            body={"requests": requests},
+        ).execute()
+        if SOURCE_TAB in sheet_ids:
+            print(f"✅ Cleared {SOURCE_TAB} content (kept header)")
+        if master_row is not None:
+            print(f"✅ Reset master_index row {master_row + 1} for {SOURCE_TAB}")
+    except Exception as e:
+        print(f"❌ Failed to update sheet: {e}")
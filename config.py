@@ -62,15 +62,29 @@ def col_letter(name: str) -> str:
 GEMINI_MODEL = "gemini-2.0-flash"
 GEMINI_TEMPERATURE = 0.1
 GEMINI_MAX_TOKENS = 700
+# Explicit context caching for SYSTEM_PROMPT. Off by default: the API rejects
+# caches below the model's minimum token count, in which case the agent falls
+# back to sending the prompt inline.
+GEMINI_CONTEXT_CACHE = os.getenv("GEMINI_CONTEXT_CACHE", "false").lower() == "true"
+GEMINI_CACHE_TTL_SECONDS = int(os.getenv("GEMINI_CACHE_TTL_SECONDS", "3600"))
+# "grpc" keeps one multiplexed HTTP/2 channel for the whole process; use
+# "rest" only where gRPC egress is blocked.
+GEMINI_TRANSPORT = os.getenv("GEMINI_TRANSPORT", "grpc")
 
 # ── Rate limiting & retries ───────────────────────────────────────
 RATE_LIMIT_RPS = 5          # max requests per second
 MAX_RETRIES = 3
 RETRY_BACKOFF_BASE = 1.0    # seconds (exponential: 1, 2, 4)
+SHEETS_BATCH_SIZE = 25      # processed rows per Sheets batchUpdate
 
 # ── Logging ───────────────────────────────────────────────────────
 LOG_DIR = Path(__file__).parent / "logs"
 LOG_DIR.mkdir(exist_ok=True)
 
+# ── AI response cache ─────────────────────────────────────────────
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "true").lower() == "true"
+AI_CACHE_DB = LOG_DIR / "ai_cache.db"
+AI_CACHE_TTL_SECONDS = int(os.getenv("AI_CACHE_TTL_SECONDS", str(7 * 86400)))
+
 # ── Scopes ────────────────────────────────────────────────────────
 SHEETS_SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
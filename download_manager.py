@@ -2,10 +2,13 @@
 download_manager.py — Safe media download with hash verification.
 """
 
+import asyncio
 import logging
+import os
 import shutil
 import subprocess
 import time
+import weakref
 from pathlib import Path
 
 import scheduler_config
@@ -14,15 +17,24 @@ import hash_utils
 logger = logging.getLogger(__name__)
 
 
+_ytdlp_bin: str | None = None
+
+
 def _resolve_ytdlp_bin() -> str | None:
-    """Resolve yt-dlp from PATH first, then project venv."""
+    """
+    Resolve yt-dlp from PATH first, then project venv.
+    The result is cached once found; a miss is retried on the next call.
+    """
+    global _ytdlp_bin
+    if _ytdlp_bin is not None:
+        return _ytdlp_bin
     found = shutil.which("yt-dlp")
-    if found:
-        return found
-    venv_bin = Path(__file__).parent / "venv" / "bin" / "yt-dlp"
-    if venv_bin.exists():
-        return str(venv_bin)
-    return None
+    if not found:
+        venv_bin = Path(__file__).parent / "venv" / "bin" / "yt-dlp"
+        if venv_bin.exists():
+            found = str(venv_bin)
+    _ytdlp_bin = found
+    return found
 
 
 def check_disk_space() -> bool:
@@ -38,56 +50,51 @@ def check_disk_space() -> bool:
     return True
 
 
-def download_video(source_url: str, expected_hash: str = "") -> dict:
-    """
-    Download video from source_url to temp directory using yt-dlp.
-    Returns dict with keys: success, path, content_hash, hash_method, error.
-    """
-    result = {
+DOWNLOAD_TIMEOUT_SECONDS = 180
+
+
+def _new_result() -> dict:
+    return {
         "success": False, "path": None,
         "content_hash": None, "hash_method": None, "error": None,
     }
 
+
+def _prepare_download(source_url: str, result: dict) -> list[str] | None:
+    """Return the yt-dlp argv, or None with result["error"] set."""
     if not check_disk_space():
         result["error"] = "insufficient_disk_space"
-        return result
+        return None
 
     scheduler_config.TEMP_DIR.mkdir(parents=True, exist_ok=True)
     output_template = str(scheduler_config.TEMP_DIR / "%(id)s.%(ext)s")
     ytdlp_bin = _resolve_ytdlp_bin()
     if not ytdlp_bin:
         result["error"] = "yt-dlp not installed"
-        return result
+        return None
 
-    cmd = [
+    return [
         ytdlp_bin,
         "--no-playlist",
         "--no-warnings",
         "-o", output_template,
+        # Have yt-dlp report the final path so we never scan TEMP_DIR
+        "--no-simulate",
+        "--print", "after_move:filepath",
         source_url,
     ]
 
-    try:
-        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=180)
-        if proc.returncode != 0:
-            result["error"] = f"yt-dlp exit {proc.returncode}: {proc.stderr[:200]}"
-            return result
-    except FileNotFoundError:
-        result["error"] = "yt-dlp not installed"
-        return result
-    except subprocess.TimeoutExpired:
-        result["error"] = "download_timeout"
-        return result
 
-    # Find the downloaded file (most recently modified)
-    downloaded = None
-    best_mtime = 0
-    for f in scheduler_config.TEMP_DIR.iterdir():
-        if f.is_file() and f.stat().st_mtime > best_mtime:
-            best_mtime = f.stat().st_mtime
-            downloaded = f
+def _finish_download(source_url: str, expected_hash: str, stdout: str, result: dict) -> dict:
+    """Locate the file yt-dlp reported, hash it and fill in result."""
+    printed = [line.strip() for line in stdout.splitlines() if line.strip()]
+    downloaded = Path(printed[-1]) if printed else None
+    try:
+        downloaded_stat = downloaded.stat() if downloaded else None
+    except OSError:
+        downloaded_stat = None
 
-    if not downloaded:
+    if not downloaded_stat:
         result["error"] = "no_file_after_download"
         return result
 
@@ -113,11 +120,90 @@ def download_video(source_url: str, expected_hash: str = "") -> dict:
         )
         result["hash_mismatch"] = True
 
-    size_mb = downloaded.stat().st_size / (1024 * 1024)
+    size_mb = downloaded_stat.st_size / (1024 * 1024)
     logger.info("Downloaded %s (%.1f MB, hash=%s)", downloaded.name, size_mb, content_hash[:16])
     return result
 
 
+def download_video(source_url: str, expected_hash: str = "") -> dict:
+    """
+    Download video from source_url to temp directory using yt-dlp.
+    Returns dict with keys: success, path, content_hash, hash_method, error.
+    """
+    result = _new_result()
+    cmd = _prepare_download(source_url, result)
+    if cmd is None:
+        return result
+
+    try:
+        proc = subprocess.run(cmd, capture_output=True, text=True, timeout=DOWNLOAD_TIMEOUT_SECONDS)
+        if proc.returncode != 0:
+            result["error"] = f"yt-dlp exit {proc.returncode}: {proc.stderr[:200]}"
+            return result
+    except FileNotFoundError:
+        result["error"] = "yt-dlp not installed"
+        return result
+    except subprocess.TimeoutExpired:
+        result["error"] = "download_timeout"
+        return result
+
+    return _finish_download(source_url, expected_hash, proc.stdout, result)
+
+
+# One semaphore per event loop: asyncio primitives cannot be shared across loops.
+_download_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _download_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _download_semaphores.get(loop)
+    if sem is None:
+        sem = asyncio.Semaphore(scheduler_config.MAX_CONCURRENT_DOWNLOADS)
+        _download_semaphores[loop] = sem
+    return sem
+
+
+async def download_video_async(source_url: str, expected_hash: str = "") -> dict:
+    """
+    Async variant of download_video. At most MAX_CONCURRENT_DOWNLOADS yt-dlp
+    processes run at once per event loop; hashing runs in a worker thread.
+    """
+    result = _new_result()
+    cmd = _prepare_download(source_url, result)
+    if cmd is None:
+        return result
+
+    async with _download_semaphore():
+        try:
+            proc = await asyncio.create_subprocess_exec(
+                *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            result["error"] = "yt-dlp not installed"
+            return result
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                proc.communicate(), timeout=DOWNLOAD_TIMEOUT_SECONDS,
+            )
+        except asyncio.TimeoutError:
+            proc.kill()
+            await proc.wait()
+            result["error"] = "download_timeout"
+            return result
+
+    if proc.returncode != 0:
+        err = stderr.decode("utf-8", errors="replace")
+        result["error"] = f"yt-dlp exit {proc.returncode}: {err[:200]}"
+        return result
+
+    return await asyncio.to_thread(
+        _finish_download, source_url, expected_hash,
+        stdout.decode("utf-8", errors="replace"), result,
+    )
+
+
 def cleanup_file(path: str | None):
     """Delete a temp file immediately."""
     if path and Path(path).exists():
@@ -137,9 +223,10 @@ def cleanup_old_temp_files():
     ).timestamp()
 
     cleaned = 0
-    for f in scheduler_config.TEMP_DIR.iterdir():
-        if f.is_file() and f.stat().st_mtime < cutoff:
-            f.unlink()
-            cleaned += 1
+    with os.scandir(scheduler_config.TEMP_DIR) as it:
+        for entry in it:
+            if entry.is_file(follow_symlinks=False) and entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                os.unlink(entry.path)
+                cleaned += 1
     if cleaned:
         logger.info("Cleaned %d old temp files.", cleaned)
@@ -4,51 +4,111 @@ Applies suggested ffmpeg commands to mitigate duplicate fingerprints.
 Includes branding pipeline: watermark, crop variation, intro/outro.
 """
 
+import functools
+import json
 import logging
 import random
+import shlex
 import subprocess
 import os
+import threading
+from collections import deque
+from fractions import Fraction
 from pathlib import Path
 
 import scheduler_config
 
+try:
+    import av
+except ImportError:
+    av = None
+
 logger = logging.getLogger(__name__)
 
 
-def get_video_duration(path: str) -> float:
-    """Get video duration in seconds using ffprobe."""
-    cmd = [
-        "ffprobe", "-v", "error",
-        "-show_entries", "format=duration",
-        "-of", "default=noprint_wrappers=1:nokey=1",
-        path,
-    ]
+# (path, mtime_ns, size) -> (duration, width, height)
+_PROBE_CACHE: dict[tuple[str, int, int], tuple[float, int, int]] = {}
+_PROBE_CACHE_MAX = 256
+
+
+def _probe_av(path: str) -> tuple[float, int, int] | None:
+    """Probe in-process with PyAV. Returns None if PyAV is missing or fails."""
+    if av is None:
+        return None
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        if result.returncode == 0 and result.stdout.strip():
-            return float(result.stdout.strip())
-    except (subprocess.TimeoutExpired, ValueError, FileNotFoundError):
-        pass
-    return 0.0
+        with av.open(path) as container:
+            duration = container.duration / av.time_base if container.duration else 0.0
+            if container.streams.video:
+                ctx = container.streams.video[0].codec_context
+                return float(duration), int(ctx.width or 0), int(ctx.height or 0)
+            return float(duration), 0, 0
+    except Exception as e:
+        logger.debug("PyAV probe failed for %s: %s", path, e)
+        return None
 
 
-def get_video_dimensions(path: str) -> tuple[int, int]:
-    """Get (width, height) of video using ffprobe."""
+def _probe_ffprobe(path: str) -> tuple[float, int, int] | None:
+    """Probe with a single ffprobe call. Returns None on failure."""
     cmd = [
         "ffprobe", "-v", "error",
         "-select_streams", "v:0",
-        "-show_entries", "stream=width,height",
-        "-of", "csv=s=x:p=0",
+        "-show_entries", "format=duration:stream=width,height",
+        "-print_format", "json",
         path,
     ]
     try:
         result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
-        if result.returncode == 0 and "x" in result.stdout:
-            w, h = result.stdout.strip().split("x")
-            return int(w), int(h)
+        if result.returncode != 0:
+            return None
+        info = json.loads(result.stdout or "{}")
     except (subprocess.TimeoutExpired, ValueError, FileNotFoundError):
-        pass
-    return 0, 0
+        return None
+
+    try:
+        duration = float(info.get("format", {}).get("duration") or 0.0)
+    except (TypeError, ValueError):
+        duration = 0.0
+    streams = info.get("streams") or [{}]
+    width = int(streams[0].get("width") or 0)
+    height = int(streams[0].get("height") or 0)
+    return duration, width, height
+
+
+def _probe(path: str, st: os.stat_result | None = None) -> tuple[float, int, int]:
+    """
+    (duration, width, height) of a video, memoized per file version.
+    Uses PyAV in-process when installed, else one ffprobe call.
+    Pass st to reuse a stat the caller already has.
+    Returns (0.0, 0, 0) if the file cannot be probed.
+    """
+    if st is None:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return 0.0, 0, 0
+    key = (path, st.st_mtime_ns, st.st_size)
+    cached = _PROBE_CACHE.get(key)
+    if cached is not None:
+        return cached
+
+    probed = _probe_av(path) or _probe_ffprobe(path)
+    if probed is None:
+        return 0.0, 0, 0
+    if len(_PROBE_CACHE) >= _PROBE_CACHE_MAX:
+        _PROBE_CACHE.clear()
+    _PROBE_CACHE[key] = probed
+    return probed
+
+
+def get_video_duration(path: str) -> float:
+    """Get video duration in seconds (PyAV or ffprobe)."""
+    return _probe(path)[0]
+
+
+def get_video_dimensions(path: str) -> tuple[int, int]:
+    """Get (width, height) of video (PyAV or ffprobe)."""
+    _, width, height = _probe(path)
+    return width, height
 
 
 def transform_video(
@@ -59,87 +119,105 @@ def transform_video(
 ) -> dict:
     """
     Apply ffmpeg transformation to video.
-    Returns dict with: success, output_path, error, duration.
+    Returns dict with: success, output_path, error, duration, width,
+    height, size_bytes. The probe values can be handed to
+    validate_for_upload(probe=...) to skip re-probing.
     """
-    result = {"success": False, "output_path": None, "error": None, "duration": 0.0}
+    result = {
+        "success": False, "output_path": None, "error": None,
+        "duration": 0.0, "width": 0, "height": 0, "size_bytes": 0,
+    }
     input_p = Path(input_path)
 
     if not input_p.exists():
         result["error"] = f"input file not found: {input_path}"
         return result
 
-    output_path = str(input_p.parent / f"upload_{input_p.stem}.mp4")
+    output_p = input_p.parent / f"upload_{input_p.stem}.mp4"
+    output_path = str(output_p)
 
-    # Step 1: Try the suggested command
+    # Suggested command first, then default (trim 0.5s + re-encode),
+    # then fallback (plain re-encode, no trim)
+    attempts = []
     if suggested_cmd:
-        cmd_str = suggested_cmd.replace("{input}", input_path).replace("{output}", output_path)
-        logger.info("Running suggested ffmpeg: %s", cmd_str[:100])
-        success = _run_ffmpeg(cmd_str)
-        if success and Path(output_path).exists():
-            result["success"] = True
-            result["output_path"] = output_path
-            result["duration"] = get_video_duration(output_path)
-            # Apply branding post-processing
-            branded = _apply_branding_pipeline(output_path, dest_account_id)
-            if branded:
-                result["output_path"] = branded
-                result["duration"] = get_video_duration(branded)
+        attempts.append(("suggested", _template_argv(suggested_cmd, input_path, output_path)))
+    attempts.append(("default", _template_argv(scheduler_config.FFMPEG_DEFAULT_CMD, input_path, output_path)))
+    attempts.append(("fallback", _template_argv(scheduler_config.FFMPEG_FALLBACK_CMD, input_path, output_path)))
+
+    for label, argv in attempts:
+        if not argv:
+            continue
+        logger.info("Running %s ffmpeg: %s", label, shlex.join(argv)[:100])
+        if _run_ffmpeg(argv) and output_p.exists():
+            # Apply branding post-processing; probe only the final file
+            final_path = _apply_branding_pipeline(output_path, dest_account_id) or output_path
+            st = os.stat(final_path)
+            duration, width, height = _probe(final_path, st)
+            result.update(
+                success=True, output_path=final_path, duration=duration,
+                width=width, height=height, size_bytes=st.st_size,
+            )
             return result
-        logger.warning("Suggested ffmpeg failed, trying default.")
-
-    # Step 2: Try default command (trim 0.5s + re-encode)
-    cmd_str = scheduler_config.FFMPEG_DEFAULT_CMD.format(
-        input=input_path, output=output_path,
-    )
-    logger.info("Running default ffmpeg: %s", cmd_str[:100])
-    success = _run_ffmpeg(cmd_str)
-    if success and Path(output_path).exists():
-        result["success"] = True
-        result["output_path"] = output_path
-        result["duration"] = get_video_duration(output_path)
-        branded = _apply_branding_pipeline(output_path, dest_account_id)
-        if branded:
-            result["output_path"] = branded
-            result["duration"] = get_video_duration(branded)
-        return result
-
-    # Step 3: Try fallback (plain re-encode, no trim)
-    cmd_str = scheduler_config.FFMPEG_FALLBACK_CMD.format(
-        input=input_path, output=output_path,
-    )
-    logger.info("Running fallback ffmpeg: %s", cmd_str[:100])
-    success = _run_ffmpeg(cmd_str)
-    if success and Path(output_path).exists():
-        result["success"] = True
-        result["output_path"] = output_path
-        result["duration"] = get_video_duration(output_path)
-        branded = _apply_branding_pipeline(output_path, dest_account_id)
-        if branded:
-            result["output_path"] = branded
-            result["duration"] = get_video_duration(branded)
-        return result
+        logger.warning("%s ffmpeg failed.", label.capitalize())
 
     result["error"] = "all ffmpeg attempts failed"
     return result
 
 
-def _run_ffmpeg(cmd_str: str) -> bool:
-    """Run an ffmpeg command string. Returns True on success."""
+def _template_argv(template: str, input_path: str, output_path: str) -> list[str] | None:
+    """
+    Split an ffmpeg command template into argv and fill {input}/{output}
+    per token, so paths never pass through a shell. Returns None if the
+    template cannot be tokenised.
+    """
     try:
-        proc = subprocess.run(
-            cmd_str, shell=True,
-            capture_output=True, text=True, timeout=300,
+        tokens = shlex.split(template)
+    except ValueError as e:
+        logger.warning("Unparseable ffmpeg command %r: %s", template[:100], e)
+        return None
+    return [
+        t.replace("{input}", input_path).replace("{output}", output_path)
+        for t in tokens
+    ] or None
+
+
+FFMPEG_TIMEOUT_SECONDS = 300
+_STDERR_TAIL_LINES = 256
+
+
+def _run_ffmpeg(argv: list[str]) -> bool:
+    """
+    Run an ffmpeg argv list (no shell). Returns True on success.
+    stderr is drained on a thread into a bounded buffer of its last lines,
+    so memory stays constant however long ffmpeg runs.
+    """
+    try:
+        proc = subprocess.Popen(
+            argv, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE, text=True, errors="replace",
         )
-        if proc.returncode != 0:
-            logger.warning("ffmpeg exit %d: %s", proc.returncode, proc.stderr[:200])
-            return False
-        return True
+    except Exception as e:
+        logger.error("ffmpeg error: %s", e)
+        return False
+
+    tail: deque[str] = deque(maxlen=_STDERR_TAIL_LINES)
+    reader = threading.Thread(target=tail.extend, args=(proc.stderr,), daemon=True)
+    reader.start()
+    try:
+        returncode = proc.wait(timeout=FFMPEG_TIMEOUT_SECONDS)
     except subprocess.TimeoutExpired:
+        proc.kill()
+        proc.wait()
         logger.error("ffmpeg timed out")
         return False
-    except Exception as e:
-        logger.error("ffmpeg error: %s", e)
+    finally:
+        reader.join()
+        proc.stderr.close()
+
+    if returncode != 0:
+        logger.warning("ffmpeg exit %d: %s", returncode, "".join(tail)[-200:])
         return False
+    return True
 
 
 # ── Branding Pipeline (#3) ───────────────────────────────────────
@@ -150,33 +228,48 @@ def _apply_branding_pipeline(video_path: str, dest_account_id: str = "") -> str
     1. Crop variation (random 2-8px)
     2. Watermark overlay (per-destination)
     3. Intro/outro concat (if configured)
-    Returns new file path, or None if no branding applied.
+    Steps 1 and 2 share one filtergraph and a single encode, which also
+    conforms the video to the intro/outro's stream parameters so step 3
+    can stay a stream copy. Returns new file path, or None if no branding
+    applied.
     """
     current = video_path
     changed = False
-
-    # Step 1: Crop variation
-    if scheduler_config.CROP_VARIATION_ENABLED:
-        cropped = apply_crop_variation(current)
-        if cropped:
-            if current != video_path:
-                Path(current).unlink(missing_ok=True)
-            current = cropped
-            changed = True
-
-    # Step 2: Watermark
+    intro_path = scheduler_config.BRANDING_INTRO
+    outro_path = scheduler_config.BRANDING_OUTRO
+    match = _concat_target(intro_path, outro_path)
+    current_params = _stream_params(current) if match else None
+    if match and current_params and (current_params[7] is None) != (match[7] is None):
+        # Conforming cannot add or drop an audio track; the concat will be skipped
+        logger.warning("Intro/outro audio presence differs from %s; not conforming.", Path(current).name)
+        match = None
+
+    # Steps 1+2: Crop variation and watermark in one ffmpeg pass
+    crop = _random_crop() if scheduler_config.CROP_VARIATION_ENABLED else None
     watermark_path = _find_watermark(dest_account_id)
-    if watermark_path:
-        watermarked = apply_watermark(current, watermark_path)
-        if watermarked:
-            if current != video_path:
-                Path(current).unlink(missing_ok=True)
-            current = watermarked
+    if crop or watermark_path or (match and current_params != match):
+        branded = apply_crop_and_watermark(current, crop, watermark_path, match=match)
+        if branded:
+            current = branded
             changed = True
+        else:
+            # Fall back to the separate passes so one bad input does not
+            # cost both steps
+            logger.warning("Fused crop/watermark failed, retrying as separate passes.")
+            if crop:
+                cropped = apply_crop_variation(current, crop)
+                if cropped:
+                    current = cropped
+                    changed = True
+            if watermark_path:
+                watermarked = apply_watermark(current, watermark_path)
+                if watermarked:
+                    if current != video_path:
+                        Path(current).unlink(missing_ok=True)
+                    current = watermarked
+                    changed = True
 
     # Step 3: Intro/outro
-    intro_path = scheduler_config.BRANDING_INTRO
-    outro_path = scheduler_config.BRANDING_OUTRO
     if intro_path or outro_path:
         concatted = apply_intro_outro(current, intro_path, outro_path)
         if concatted:
@@ -188,6 +281,282 @@ def _apply_branding_pipeline(video_path: str, dest_account_id: str = "") -> str
     return current if changed else None
 
 
+def _stream_params(path: str) -> tuple | None:
+    """
+    (codec, profile, level, pix_fmt, fps, width, height, audio) of the first
+    video stream, or None. profile is the codec's profile name (e.g. "High")
+    and level its level_idc (e.g. 31), both part of the H.264 parameter sets
+    a stream-copy concat must agree on. audio is (codec, sample_rate,
+    channels) of the first audio
+    stream, or None if there is none; a stream-copy concat needs it to
+    match as well. fps is the stream's nominal rate (r_frame_rate), not
+    avg_frame_rate: the average comes from container timing and drifts off
+    N/D even for a clip just conformed with fps=N/D.
+    """
+    if av is not None:
+        try:
+            with av.open(path) as container:
+                if not container.streams.video:
+                    return None
+                stream = container.streams.video[0]
+                ctx = stream.codec_context
+                rate = stream.base_rate or stream.average_rate
+                audio = None
+                if container.streams.audio:
+                    actx = container.streams.audio[0].codec_context
+                    audio = (actx.name, actx.sample_rate, actx.layout.nb_channels)
+                return (
+                    ctx.name, ctx.profile, ctx.level, ctx.pix_fmt, Fraction(rate),
+                    ctx.width, ctx.height, audio,
+                )
+        except Exception as e:
+            logger.debug("PyAV stream probe failed for %s: %s", path, e)
+    cmd = [
+        "ffprobe", "-v", "error",
+        "-show_entries",
+        "stream=codec_type,codec_name,profile,level,pix_fmt,r_frame_rate,width,height,"
+        "sample_rate,channels",
+        "-print_format", "json",
+        path,
+    ]
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=30)
+        streams = json.loads(result.stdout or "{}").get("streams", [])
+        video = next(st for st in streams if st.get("codec_type") == "video")
+        a = next((st for st in streams if st.get("codec_type") == "audio"), None)
+        audio = (a["codec_name"], int(a["sample_rate"]), int(a["channels"])) if a else None
+        return (
+            video["codec_name"], video.get("profile"), int(video.get("level", 0)),
+            video["pix_fmt"], Fraction(video["r_frame_rate"]),
+            int(video["width"]), int(video["height"]), audio,
+        )
+    except (subprocess.TimeoutExpired, FileNotFoundError, ValueError,
+            StopIteration, KeyError, ZeroDivisionError):
+        return None
+
+
+@functools.lru_cache(maxsize=8)
+def _clip_params(path: str) -> tuple | None:
+    """_stream_params of a static branding clip, probed once per process."""
+    return _stream_params(path)
+
+
+# Audio codecs a branding clip may use, and the encoder that produces each
+_AUDIO_ENCODERS = {"aac": "aac", "mp3": "libmp3lame", "opus": "libopus"}
+
+# H.264 profile names as probed, and the -profile:v value that produces each
+_H264_PROFILES = {
+    "Constrained Baseline": "baseline",
+    "Baseline": "baseline",
+    "Main": "main",
+    "High": "high",
+    "High 10": "high10",
+    "High 4:2:2": "high422",
+    "High 4:4:4 Predictive": "high444",
+}
+
+
+def _concat_target(intro_path: str, outro_path: str) -> tuple | None:
+    """
+    Stream params the branded video must match for a stream-copy concat
+    with the configured intro/outro, or None if there is nothing to match
+    or the clips cannot be matched: intro and outro must share the same
+    params, and the video/audio codecs must be ones we can encode to.
+    """
+    target = None
+    for clip in (intro_path, outro_path):
+        if not (clip and Path(clip).exists()):
+            continue
+        params = _clip_params(clip)
+        if params is None:
+            return None
+        if target is not None and params != target:
+            logger.warning("Intro and outro stream params differ (%s vs %s); cannot match both.",
+                           target, params)
+            return None
+        target = params
+    if target is None:
+        return None
+    if target[0] != "h264":
+        logger.warning("Branding clips are %s, not h264; cannot match them.", target[0])
+        return None
+    if target[1] not in _H264_PROFILES or target[2] < 10:
+        logger.warning("Branding clips use H.264 profile %s level %s; cannot match them.",
+                       target[1], target[2])
+        return None
+    audio = target[7]
+    if audio and audio[0] not in _AUDIO_ENCODERS:
+        logger.warning("Branding clips have %s audio; cannot match it.", audio[0])
+        return None
+    return target
+
+
+def _conform_audio_args(match: tuple | None) -> list[str]:
+    """Audio output args: re-encode to match's audio, else stream copy."""
+    audio = match[7] if match else None
+    if not audio:
+        # Clips without audio cannot be matched by a source that has it;
+        # apply_intro_outro's param check skips the concat in that case
+        return ["-c:a", "copy"]
+    codec, sample_rate, channels = audio
+    return ["-c:a", _AUDIO_ENCODERS[codec], "-ar", str(sample_rate), "-ac", str(channels)]
+
+
+def _conform_video_args(match: tuple) -> list[str]:
+    """-profile:v/-level args that make the encoder emit match's H.264 profile and level."""
+    level = match[2]
+    return ["-profile:v", _H264_PROFILES[match[1]], "-level", f"{level // 10}.{level % 10}"]
+
+
+def _conform_filter(match: tuple) -> str:
+    """
+    Filter chain that brings a video to match's size, fps and pixel format.
+    The picture is fitted inside the target frame and letterboxed, never
+    stretched, so a 16:9 video next to a 9:16 intro keeps its aspect ratio.
+    """
+    _, _, _, pix_fmt, fps, width, height, _ = match
+    return (
+        f"scale={width}:{height}:force_original_aspect_ratio=decrease,"
+        f"pad={width}:{height}:(ow-iw)/2:(oh-ih)/2,setsar=1,"
+        f"fps={fps.numerator}/{fps.denominator},format={pix_fmt}"
+    )
+
+
+def _random_crop() -> tuple[int, int, int, int]:
+    """Pick random (top, bottom, left, right) crop margins in [2, CROP_MAX_PX]."""
+    max_px = scheduler_config.CROP_MAX_PX
+    span = max_px - 1
+    if not 1 <= span <= 256:
+        # Lanes are 8 bits wide; randint also keeps raising on bad config
+        return tuple(random.randint(2, max_px) for _ in range(4))
+    # One 32-bit draw split into four byte lanes
+    r = random.getrandbits(32)
+    return (
+        2 + (r & 0xFF) % span,
+        2 + (r >> 8 & 0xFF) % span,
+        2 + (r >> 16 & 0xFF) % span,
+        2 + (r >> 24 & 0xFF) % span,
+    )
+
+
+def _crop_filter(crop: tuple[int, int, int, int]) -> str:
+    top, bottom, left, right = crop
+    # libx264/yuv420p rejects odd dimensions, so round the size down to even
+    return (
+        f"crop=trunc((iw-{left+right})/2)*2:trunc((ih-{top+bottom})/2)*2"
+        f":{left}:{top}"
+    )
+
+
+# ffmpeg -hwaccels name for each HWACCEL mode
+_HWACCEL_DECODERS = {"nvenc": "cuda", "vaapi": "vaapi", "qsv": "qsv"}
+
+
+@functools.lru_cache(maxsize=1)
+def _available_hwaccels() -> frozenset[str]:
+    """Hardware decoders this ffmpeg build reports, probed once per process."""
+    try:
+        proc = subprocess.run(
+            ["/usr/bin/ffmpeg", "-hide_banner", "-hwaccels"],
+            capture_output=True, text=True, timeout=10,
+        )
+    except (subprocess.TimeoutExpired, FileNotFoundError):
+        return frozenset()
+    if proc.returncode != 0:
+        return frozenset()
+    # First line is the "Hardware acceleration methods:" header
+    return frozenset(line.strip() for line in proc.stdout.splitlines()[1:] if line.strip())
+
+
+@functools.lru_cache(maxsize=1)
+def _hwaccel_mode() -> str:
+    """Configured HWACCEL mode if this ffmpeg supports it, else "none"."""
+    mode = scheduler_config.HWACCEL
+    decoder = _HWACCEL_DECODERS.get(mode)
+    if not decoder:
+        return "none"
+    if decoder not in _available_hwaccels():
+        logger.warning("HWACCEL=%s requested but ffmpeg lacks %s; using software.", mode, decoder)
+        return "none"
+    return mode
+
+
+def _hwaccel_args(mode: str) -> tuple[list[str], str, list[str]]:
+    """
+    (input args, filter suffix, encoder args) for a hardware mode.
+    Decoded frames are downloaded to system memory so the crop/overlay
+    filters stay the same; only decode and encode move to the GPU.
+    """
+    if mode == "nvenc":
+        return ["-hwaccel", "cuda"], "", ["-c:v", "h264_nvenc", "-preset", "p4"]
+    if mode == "vaapi":
+        return (
+            ["-hwaccel", "vaapi", "-vaapi_device", scheduler_config.VAAPI_DEVICE],
+            ",format=nv12,hwupload",
+            ["-c:v", "h264_vaapi"],
+        )
+    if mode == "qsv":
+        return ["-hwaccel", "qsv"], "", ["-c:v", "h264_qsv", "-preset", "veryfast"]
+    return [], "", []
+
+
+def apply_crop_and_watermark(
+    video_path: str,
+    crop: tuple[int, int, int, int] | None,
+    watermark_path: str | None,
+    opacity: float = 0.10,
+    hwaccel: str | None = None,
+    match: tuple | None = None,
+) -> str | None:
+    """
+    Crop and/or watermark in a single filter_complex pass. match is an
+    optional _stream_params tuple the output is conformed to (H.264
+    profile/level, size, fps, pixel format, audio codec/rate/channels).
+    Uses the HWACCEL decode/encode path when available and retries in
+    software if the hardware pass fails.
+    """
+    mode = _hwaccel_mode() if hwaccel is None else hwaccel
+    input_args, upload_filter, encode_args = _hwaccel_args(mode)
+    if match:
+        if not encode_args:
+            # ffmpeg's default would be libx264 too, but at its own profile/level
+            encode_args = ["-c:v", "libx264", "-preset", "veryfast"]
+        encode_args = encode_args + _conform_video_args(match)
+    post = (f",{_conform_filter(match)}" if match else "") + upload_filter
+    video = f"[0:v]{_crop_filter(crop)}" if crop else "[0:v]null"
+    if watermark_path:
+        graph = [
+            f"{video}[c]",
+            f"[1:v]format=rgba,colorchannelmixer=aa={opacity}[wm]",
+            f"[c][wm]overlay=W-w-10:H-h-10{post}[v]",
+        ]
+    else:
+        graph = [f"{video}{post}[v]"]
+
+    src = Path(video_path)
+    output = str(src.with_name(f"brand_{src.name}"))
+    cmd = ["/usr/bin/ffmpeg", "-y", *input_args, "-i", video_path]
+    if watermark_path:
+        cmd += ["-i", watermark_path]
+    cmd += [
+        "-threads", "1",
+        "-filter_complex", ";".join(graph),
+        "-map", "[v]", "-map", "0:a?", *encode_args, *_conform_audio_args(match), output,
+    ]
+    if _run_ffmpeg(cmd) and Path(output).exists():
+        logger.info(
+            "Branding applied in one pass: crop=%s watermark=%s hwaccel=%s",
+            crop, Path(watermark_path).name if watermark_path else None, mode,
+        )
+        return output
+    if mode != "none":
+        logger.warning("Hardware branding pass (%s) failed, retrying in software.", mode)
+        return apply_crop_and_watermark(
+            video_path, crop, watermark_path, opacity, hwaccel="none", match=match,
+        )
+    return None
+
+
 def _find_watermark(dest_account_id: str) -> str | None:
     """Find watermark PNG for a destination. Falls back to default.png."""
     if not dest_account_id:
@@ -203,34 +572,33 @@ def _find_watermark(dest_account_id: str) -> str | None:
 
 def apply_watermark(video_path: str, watermark_path: str, opacity: float = 0.10) -> str | None:
     """Overlay a semi-transparent watermark at bottom-right."""
-    output = str(Path(video_path).parent / f"wm_{Path(video_path).name}")
-    cmd = (
-        f'/usr/bin/ffmpeg -y -i "{video_path}" -i "{watermark_path}" '
-        f'-threads 1 '
-        f'-filter_complex "[1:v]format=rgba,colorchannelmixer=aa={opacity}[wm];'
-        f'[0:v][wm]overlay=W-w-10:H-h-10" '
-        f'-c:a copy "{output}"'
-    )
+    src = Path(video_path)
+    output = str(src.with_name(f"wm_{src.name}"))
+    cmd = [
+        "/usr/bin/ffmpeg", "-y", "-i", video_path, "-i", watermark_path,
+        "-threads", "1",
+        "-filter_complex",
+        f"[1:v]format=rgba,colorchannelmixer=aa={opacity}[wm];"
+        "[0:v][wm]overlay=W-w-10:H-h-10",
+        "-c:a", "copy", output,
+    ]
     if _run_ffmpeg(cmd) and Path(output).exists():
         logger.info("Watermark applied: %s", Path(output).name)
         return output
     return None
 
 
-def apply_crop_variation(video_path: str) -> str | None:
+def apply_crop_variation(video_path: str, crop: tuple[int, int, int, int] | None = None) -> str | None:
     """Random 2-8px crop from edges to create unique frames."""
-    max_px = scheduler_config.CROP_MAX_PX
-    top = random.randint(2, max_px)
-    bottom = random.randint(2, max_px)
-    left = random.randint(2, max_px)
-    right = random.randint(2, max_px)
-    output = str(Path(video_path).parent / f"crop_{Path(video_path).name}")
-    cmd = (
-        f'/usr/bin/ffmpeg -y -i "{video_path}" '
-        f'-threads 1 '
-        f'-vf "crop=iw-{left+right}:ih-{top+bottom}:{left}:{top}" '
-        f'-c:a copy "{output}"'
-    )
+    top, bottom, left, right = crop or _random_crop()
+    src = Path(video_path)
+    output = str(src.with_name(f"crop_{src.name}"))
+    cmd = [
+        "/usr/bin/ffmpeg", "-y", "-i", video_path,
+        "-threads", "1",
+        "-vf", _crop_filter((top, bottom, left, right)),
+        "-c:a", "copy", output,
+    ]
     if _run_ffmpeg(cmd) and Path(output).exists():
         logger.info("Crop variation applied: top=%d bot=%d left=%d right=%d", top, bottom, left, right)
         return output
@@ -249,13 +617,23 @@ def apply_intro_outro(video_path: str, intro_path: str = "", outro_path: str = "
         parts.append(outro_path)
     if len(parts) < 2:
         return None  # Nothing to concat
+    # A stream-copy concat of mismatched clips yields a broken file; skip it
+    known = {
+        _stream_params(p) if p == video_path else _clip_params(p) for p in parts
+    } - {None}
+    if len(known) > 1:
+        logger.warning("Intro/outro skipped: stream params differ %s", sorted(map(str, known)))
+        return None
     # Write concat list
-    concat_file = str(Path(video_path).parent / "concat_list.txt")
+    # Per-video list name so parallel workers sharing TEMP_DIR don't collide
+    src = Path(video_path)
+    concat_file = str(src.with_name(f"concat_{src.stem}.txt"))
     with open(concat_file, "w") as f:
         for p in parts:
-            f.write(f"file '{p}'\n")
-    output = str(Path(video_path).parent / f"branded_{Path(video_path).name}")
-    cmd = f'ffmpeg -y -f concat -safe 0 -i "{concat_file}" -c copy "{output}"'
+            escaped = p.replace("'", "'\\''")
+            f.write(f"file '{escaped}'\n")
+    output = str(src.with_name(f"branded_{src.name}"))
+    cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", concat_file, "-c", "copy", output]
     if _run_ffmpeg(cmd) and Path(output).exists():
         Path(concat_file).unlink(missing_ok=True)
         logger.info("Intro/outro concat applied (%d parts)", len(parts))
@@ -266,21 +644,28 @@ def apply_intro_outro(video_path: str, intro_path: str = "", outro_path: str = "
 
 # ── Validation ────────────────────────────────────────────────────
 
-def validate_for_upload(path: str, platform: str = "youtube") -> dict:
+def validate_for_upload(
+    path: str,
+    platform: str = "youtube",
+    probe: tuple[float, int, int] | None = None,
+) -> dict:
     """
     Validate video meets platform requirements.
+    probe is an optional (duration, width, height) already known for
+    path, e.g. from transform_video's result; it skips probing.
     Returns dict with: valid, warnings (list), error.
     """
     result = {"valid": True, "warnings": [], "error": None}
 
-    if not Path(path).exists():
+    try:
+        st = os.stat(path)
+    except OSError:
         result["valid"] = False
         result["error"] = "file does not exist"
         return result
 
-    duration = get_video_duration(path)
-    width, height = get_video_dimensions(path)
-    file_size = Path(path).stat().st_size / (1024 * 1024)
+    duration, width, height = probe if probe is not None else _probe(path, st)
+    file_size = st.st_size / (1024 * 1024)
 
     # Duration checks
     if platform == "youtube" and duration > scheduler_config.MAX_SHORTS_DURATION:
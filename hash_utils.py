@@ -1,44 +1,140 @@
 """
 hash_utils.py — Content hashing for deduplication.
-Supports full SHA256, head+tail SHA256, and metadata-based hashing.
+Supports full and head+tail file hashing (SHA256, or BLAKE3/xxh3 via
+HASH_ALGO), and metadata-based hashing.
 """
 
+import functools
 import hashlib
+import logging
+import mmap
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from urllib.parse import urlparse, urlunparse
 
 import scraper_config
 
+try:
+    import blake3
+except ImportError:
+    blake3 = None
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
+
+logger = logging.getLogger(__name__)
+
+
+_READ_CHUNK = 1024 * 1024
+_YT_V_RE = re.compile(r"v=([A-Za-z0-9_-]+)")
+_CLEAN_NON_ALNUM = re.compile(r"[^a-z0-9_-]")
+_DUP_UNDER = re.compile(r"_+")
+_HEADTAIL_CHUNK = 10 * 1024 * 1024  # 10MB from each end
+
+
+@functools.lru_cache(maxsize=None)
+def _resolve_algo(algo: str) -> str:
+    """HASH_ALGO value, falling back to sha256 if its package is missing."""
+    if algo == "blake3" and blake3 is not None:
+        return algo
+    if algo == "xxh3" and xxhash is not None:
+        return algo
+    if algo != "sha256":
+        logger.warning("HASH_ALGO=%s unavailable, using sha256", algo)
+    return "sha256"
+
+
+def _new_hasher(algo: str):
+    if algo == "blake3":
+        return blake3.blake3(max_threads=blake3.blake3.AUTO)
+    if algo == "xxh3":
+        return xxhash.xxh3_128()
+    return hashlib.sha256()
+
+
+def _file_digest(f, algo: str = "sha256"):
+    """Digest of an open binary file; hashlib.file_digest on Python 3.11+."""
+    if hasattr(hashlib, "file_digest"):
+        return hashlib.file_digest(f, lambda: _new_hasher(algo))
+    h = _new_hasher(algo)
+    buf = bytearray(_READ_CHUNK)
+    view = memoryview(buf)
+    while n := f.readinto(buf):
+        h.update(view[:n])
+    return h
+
+
+def _map_file(f) -> mmap.mmap | None:
+    """Read-only mmap of an open file, or None if it cannot be mapped."""
+    try:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (ValueError, OSError):
+        return None  # empty files and filesystems without mmap support
+    if hasattr(mmap, "MADV_SEQUENTIAL"):
+        mm.madvise(mmap.MADV_SEQUENTIAL)
+    return mm
+
 
 def compute_file_hash(file_path: str | Path) -> tuple[str, str]:
     """
-    Compute SHA256 of a file.
+    Compute a content hash of a file with HASH_ALGO (default SHA256).
     For files > HASH_HEADTAIL_THRESHOLD_MB, uses head+tail method.
-    Returns (hex_hash, method) where method is 'full' or 'headtail'.
+    Returns (hex_hash, method) where method is 'full' or 'headtail',
+    suffixed with the algorithm for non-SHA256 hashes (e.g. 'full_blake3').
     """
     file_path = Path(file_path)
     file_size = file_path.stat().st_size
     threshold = scraper_config.HASH_HEADTAIL_THRESHOLD_MB * 1024 * 1024
+    algo = _resolve_algo(scraper_config.HASH_ALGO)
+    method = "full" if file_size <= threshold else "headtail"
+    if algo != "sha256":
+        method = f"{method}_{algo}"
 
-    if file_size <= threshold:
-        # Full file hash
-        h = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            while chunk := f.read(8192):
-                h.update(chunk)
-        return h.hexdigest(), "full"
-    else:
-        # Head + tail hash (first 10MB + last 10MB)
-        chunk_size = 10 * 1024 * 1024  # 10MB
-        h = hashlib.sha256()
-        with open(file_path, "rb") as f:
-            # Read first 10MB
-            head = f.read(chunk_size)
-            h.update(head)
-            # Seek to last 10MB
-            f.seek(-chunk_size, 2)
-            tail = f.read(chunk_size)
-            h.update(tail)
-        return h.hexdigest(), "headtail"
+    with open(file_path, "rb") as f:
+        mm = _map_file(f)
+        if mm is None:
+            if hasattr(os, "posix_fadvise"):
+                os.posix_fadvise(f.fileno(), 0, 0, os.POSIX_FADV_SEQUENTIAL)
+            if method.startswith("full"):
+                return _file_digest(f, algo).hexdigest(), method
+            h = _new_hasher(algo)
+            h.update(f.read(_HEADTAIL_CHUNK))
+            f.seek(-_HEADTAIL_CHUNK, 2)
+            h.update(f.read(_HEADTAIL_CHUNK))
+            return h.hexdigest(), method
+
+        # Hash straight from the page cache: no Python read loop, no copies
+        with mm, memoryview(mm) as view:
+            h = _new_hasher(algo)
+            if method.startswith("full"):
+                h.update(view)
+            else:
+                if hasattr(mmap, "MADV_WILLNEED"):
+                    # Start paging the tail in while the head is hashed
+                    tail = max(0, len(mm) - _HEADTAIL_CHUNK)
+                    mm.madvise(mmap.MADV_WILLNEED, tail - tail % mmap.PAGESIZE)
+                h.update(view[:_HEADTAIL_CHUNK])
+                h.update(view[-_HEADTAIL_CHUNK:])
+    return h.hexdigest(), method
+
+
+def compute_file_hashes_batch(paths: list[str | Path]) -> list[tuple[str, str]]:
+    """
+    compute_file_hash for many files on a thread pool, in input order.
+    hashlib (and blake3/xxhash) release the GIL while hashing large
+    buffers, so threads overlap one file's disk reads with another's
+    hashing without needing processes. Errors propagate as in
+    compute_file_hash.
+    """
+    if len(paths) <= 1:
+        return [compute_file_hash(p) for p in paths]
+    workers = min(8, os.cpu_count() or 2, len(paths))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(compute_file_hash, paths))
 
 
 def compute_metadata_hash(
@@ -61,9 +157,6 @@ def normalize_url(url: str) -> str:
     Normalize a video URL to a canonical form for dedupe.
     Strips query params, trailing slashes, and standardizes domain.
     """
-    import re
-    from urllib.parse import urlparse, urlunparse
-
     url = url.strip()
     parsed = urlparse(url)
 
@@ -75,7 +168,7 @@ def normalize_url(url: str) -> str:
         elif "/shorts/" in parsed.path:
             video_id = parsed.path.split("/shorts/")[-1].strip("/")
         elif "v=" in (parsed.query or ""):
-            match = re.search(r"v=([A-Za-z0-9_-]+)", parsed.query)
+            match = _YT_V_RE.search(parsed.query)
             video_id = match.group(1) if match else parsed.path.strip("/")
         else:
             video_id = parsed.path.strip("/")
@@ -101,9 +194,8 @@ def clean_tab_name(channel_id: str) -> str:
     Generate a clean sheet tab name from a channel ID.
     Format: source__{clean_id} (lowercase, alphanum, hyphen, underscore, max 40).
     """
-    import re
     clean = channel_id.lower().strip()
-    clean = re.sub(r"[^a-z0-9_-]", "_", clean)
-    clean = re.sub(r"_+", "_", clean).strip("_")
+    clean = _CLEAN_NON_ALNUM.sub("_", clean)
+    clean = _DUP_UNDER.sub("_", clean).strip("_")
     clean = clean[:40]
     return f"source__{clean}"
@@ -1,15 +1,18 @@
 
-import sys
-sys.path.append("/home/ubuntu/gravix-agent")
-from dotenv import load_dotenv
-load_dotenv("/home/ubuntu/gravix-agent/.env")
+import _bootstrap  # noqa: F401
 import queue_db
 
-conn = queue_db._get_conn()
-try:
-    rows = conn.execute("SELECT * FROM upload_queue").fetchall()
+
+def main():
+    with queue_db._conn() as conn:
+        columns = [c[1] for c in conn.execute("PRAGMA table_info(upload_queue)")]
+        fields = ", ".join(f"'{c}', \"{c}\"" for c in columns)
+        # Let SQLite serialize each row as JSON instead of building dicts here
+        rows = conn.execute(f"SELECT json_object({fields}) FROM upload_queue").fetchall()
     print(f"Total rows in queue: {len(rows)}")
-    for r in rows:
-        print(dict(r))
-finally:
-    conn.close()
+    for (row_json,) in rows:
+        print(row_json)
+
+
+if __name__ == "__main__":
+    main()
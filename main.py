@@ -4,43 +4,85 @@ CLI entry point with rate limiting, retries, and logging.
 """
 
 import argparse
+import asyncio
+import atexit
 import json
 import logging
+import queue
 import sys
 import time
 from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 import config
 import sheets_client
 import ai_agent
 
 # ── Logging setup ─────────────────────────────────────────────────
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[
-        logging.StreamHandler(sys.stdout),
-        logging.FileHandler(config.LOG_DIR / "agent.log", encoding="utf-8"),
-    ],
-)
+# Records go through a queue so disk/stdout writes happen on the listener
+# thread, not in the processing loop.
+_log_formatter = logging.Formatter("%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+_log_handlers = [
+    logging.StreamHandler(sys.stdout),
+    RotatingFileHandler(
+        config.LOG_DIR / "agent.log", maxBytes=50 * 1024 * 1024, backupCount=5, encoding="utf-8",
+    ),
+]
+for _handler in _log_handlers:
+    _handler.setFormatter(_log_formatter)
+_log_queue: queue.Queue = queue.Queue(-1)
+logging.getLogger().setLevel(logging.INFO)
+logging.getLogger().addHandler(QueueHandler(_log_queue))
+_log_listener = QueueListener(_log_queue, *_log_handlers)
+_log_listener.start()
+atexit.register(_log_listener.stop)
 logger = logging.getLogger("gravix-agent")
 
 
-def process_single_row(row: dict, sheets, dry_run: bool = False) -> dict | None:
+class TokenBucket:
+    """Async token bucket: `rate` acquisitions per second, bursting up to `rate`."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+async def process_single_row(
+    row: dict, sheets, limiter: TokenBucket, dry_run: bool = False,
+    error_batch: list[tuple[int, str]] | None = None,
+) -> dict | None:
     """
-    Process one row with retries and error handling.
-    Returns the AI result dict or None on failure.
+    Process one row with retries and error handling. Every AI call,
+    including retries, takes a token from limiter first.
+    Returns the AI result dict or None on failure. Successful results are
+    not written here; the caller batches them via flush_results(). Final
+    errors are appended to error_batch when given, else written directly.
     """
     row_id = row.get("row_id", "?")
     sheet_row = row.get("_sheet_row", 0)
 
     for attempt in range(1, config.MAX_RETRIES + 1):
         try:
+            await limiter.acquire()
             logger.info(
                 "Processing row %s (sheet row %d) — attempt %d/%d",
                 row_id, sheet_row, attempt, config.MAX_RETRIES,
             )
-            result = ai_agent.process_row(row)
+            result = await ai_agent.process_row_async(row)
 
             # Inject agent metadata
             result["status"] = "DONE"
@@ -54,9 +96,6 @@ def process_single_row(row: dict, sheets, dry_run: bool = False) -> dict | None:
                 print("=" * 60)
                 print(json.dumps(result, indent=2, ensure_ascii=False))
                 print("=" * 60 + "\n")
-            else:
-                sheets_client.write_row_results(sheet_row, result, sheets)
-                logger.info("✓ Row %s written successfully.", row_id)
 
             return result
 
@@ -67,15 +106,113 @@ def process_single_row(row: dict, sheets, dry_run: bool = False) -> dict | None:
             if attempt < config.MAX_RETRIES:
                 wait = config.RETRY_BACKOFF_BASE * (2 ** (attempt - 1))
                 logger.info("Retrying in %.1fs...", wait)
-                time.sleep(wait)
+                await asyncio.sleep(wait)
             else:
                 error_msg = f"All {config.MAX_RETRIES} attempts failed. Last error: {e}"
                 logger.error(error_msg)
                 if not dry_run:
-                    sheets_client.write_error(sheet_row, error_msg, sheets)
+                    if error_batch is not None:
+                        error_batch.append((sheet_row, error_msg))
+                    else:
+                        await asyncio.to_thread(sheets_client.write_error, sheet_row, error_msg, sheets)
                 return None
 
 
+def _flush_with_retries(batch: list, write, sheets, label: str) -> tuple[list, Exception | None]:
+    """
+    Send a buffered batch with write(batch, sheets), retrying on failure.
+    Clears the buffer and returns (rows that could not be written, last error).
+    """
+    if not batch:
+        return [], None
+    count = len(batch)
+    last_error = None
+    for attempt in range(1, config.MAX_RETRIES + 1):
+        try:
+            write(batch, sheets)
+            logger.info("✓ %d %s row(s) written successfully.", count, label)
+            batch.clear()
+            return [], None
+        except Exception as e:
+            last_error = e
+            logger.error("Batch %s write attempt %d failed for %d row(s): %s", label, attempt, count, e)
+            if attempt < config.MAX_RETRIES:
+                time.sleep(config.RETRY_BACKOFF_BASE * (2 ** (attempt - 1)))
+    failed = list(batch)
+    batch.clear()
+    return failed, last_error
+
+
+def flush_results(batch: list[tuple[int, dict]], sheets) -> int:
+    """
+    Write buffered (sheet_row, result) pairs in one Sheets call. Rows whose
+    results still cannot be written are marked ERROR instead, so they do
+    not stay unmarked in the sheet. Returns the number of such rows.
+    """
+    failed, error = _flush_with_retries(batch, sheets_client.write_rows_results, sheets, "result")
+    if failed:
+        flush_errors([(sheet_row, f"Result write failed: {error}") for sheet_row, _ in failed], sheets)
+    return len(failed)
+
+
+def flush_errors(batch: list[tuple[int, str]], sheets) -> int:
+    """Mark buffered (sheet_row, error_msg) pairs as ERROR in one Sheets call."""
+    failed, _ = _flush_with_retries(batch, sheets_client.write_errors, sheets, "error")
+    return len(failed)
+
+
+async def process_all_async(pending: list[dict], sheets, dry_run: bool = False) -> tuple[int, int]:
+    """
+    Process rows with up to RATE_LIMIT_RPS AI calls in flight, started no
+    faster than RATE_LIMIT_RPS per second. Results and errors are flushed
+    to the sheet every SHEETS_BATCH_SIZE rows and at the end.
+    Returns (processed, errors).
+    """
+    limiter = TokenBucket(config.RATE_LIMIT_RPS)
+    in_flight = asyncio.Semaphore(max(1, int(config.RATE_LIMIT_RPS)))
+    processed = 0
+    errors = 0
+    batch: list[tuple[int, dict]] = []
+    error_batch: list[tuple[int, str]] = []
+    # The sheets service's HTTP transport is not thread-safe, so only one
+    # flush thread may use it at a time.
+    sheets_lock = asyncio.Lock()
+
+    async def flush(final: bool = False):
+        # Hand the full buffers to a worker thread and keep filling new ones
+        nonlocal batch, error_batch, processed, errors
+        if final or len(batch) >= config.SHEETS_BATCH_SIZE:
+            full, batch = batch, []
+            async with sheets_lock:
+                failed = await asyncio.to_thread(flush_results, full, sheets)
+            processed -= failed
+            errors += failed
+        if final or len(error_batch) >= config.SHEETS_BATCH_SIZE:
+            full, error_batch = error_batch, []
+            async with sheets_lock:
+                await asyncio.to_thread(flush_errors, full, sheets)
+
+    async def task(row: dict):
+        nonlocal processed, errors
+        row_errors: list[tuple[int, str]] = []
+        async with in_flight:
+            result = await process_single_row(
+                row, sheets, limiter, dry_run=dry_run, error_batch=row_errors,
+            )
+        error_batch.extend(row_errors)
+        if result:
+            processed += 1
+            if not dry_run:
+                batch.append((row.get("_sheet_row", 0), result))
+        else:
+            errors += 1
+        await flush()
+
+    await asyncio.gather(*(task(r) for r in pending))
+    await flush(final=True)
+    return processed, errors
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Gravix AI Content Agent — Process video metadata from Google Sheets",
@@ -144,25 +281,8 @@ def main():
 
     logger.info("Found %d pending row(s) to process.", len(pending))
 
-    # ── Process rows with rate limiting ────────────────────────────
-    min_interval = 1.0 / config.RATE_LIMIT_RPS
-    processed = 0
-    errors = 0
-    last_call = 0.0
-
-    for row in pending:
-        # Rate limiting
-        now = time.time()
-        elapsed = now - last_call
-        if elapsed < min_interval:
-            time.sleep(min_interval - elapsed)
-
-        last_call = time.time()
-        result = process_single_row(row, sheets, dry_run=args.dry_run)
-        if result:
-            processed += 1
-        else:
-            errors += 1
+    # ── Process rows concurrently under the AI rate limit ──────────
+    processed, errors = asyncio.run(process_all_async(pending, sheets, args.dry_run))
 
     # ── Summary ────────────────────────────────────────────────────
     logger.info(
@@ -3,62 +3,478 @@ oauth_helper.py — OAuth handshake and token management for destination account
 Handles YouTube and Instagram OAuth flows, token refresh, and encrypted storage.
 """
 
+import fcntl
 import json
 import logging
+import mmap
 import os
 import time
 import secrets
+import threading
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from pathlib import Path
 from typing import Any
 
+import requests
+from requests.adapters import HTTPAdapter
+
 import scheduler_config
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
 
 # ── Credential storage (simple encrypted-at-rest JSON file) ──────
 
-import fcntl
+def _loads(raw: bytes | mmap.mmap) -> Any:
+    if orjson is not None:
+        return orjson.loads(raw if isinstance(raw, bytes) else memoryview(raw))
+    return json.loads(raw if isinstance(raw, bytes) else raw[:])
 
-def _load_credentials() -> dict:
-    """Load stored credentials from JSON file. ASSUMES LOCK IS HELD if used internally."""
+
+def _dumps(data: Any) -> bytes:
+    # Compact: the file is machine-managed, and fewer bytes means less to fsync.
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(",", ":")).encode("utf-8")
+
+
+def _dumps_line(record: dict) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(record, option=orjson.OPT_APPEND_NEWLINE)
+    return (json.dumps(record) + "\n").encode("utf-8")
+
+
+# Credentials are a JSON snapshot plus a write-ahead log (credentials.wal)
+# of account mutations. A transaction appends one line to the log instead
+# of rewriting every account; once the log outgrows the snapshot (or
+# WAL_COMPACT_MIN_BYTES) the next commit folds it into a new snapshot.
+#
+# The log's first line names the snapshot it applies to by stat identity
+# WAL_BASE_KEY, a random token every snapshot write stores inside the
+# snapshot itself, so the pair still matches after a copy or a restore from
+# backup (which changes inode and mtime). Compaction replaces the snapshot
+# first and then the log, so a crash in between leaves a log that no longer
+# matches and is ignored; a reader that raced a compaction sees the
+# mismatch while the snapshot path has moved on and retries.
+WAL_COMPACT_MIN_BYTES = 16 * 1024
+WAL_BASE_KEY = "wal_base"
+
+# The last merged state seen: (key, raw bytes, usable log size), keyed by
+# snapshot and log stat identity. Callers mutate what _load_credentials
+# returns, so a hit re-parses the cached bytes (several times cheaper than
+# deepcopy) instead of handing out a shared dict; it only saves the
+# open+read+replay. The tuple is swapped in with one assignment so threads
+# never see a mismatched pair.
+_CRED_CACHE: dict[str, Any] = {"entry": (None, b"", None)}
+
+# Snapshots at least this large are mapped rather than read, so orjson
+# parses straight from the page cache without a user-space copy. Saves
+# replace the file by rename, so a mapping of the old inode never changes.
+_MMAP_MIN_BYTES = 64 * 1024
+
+
+def _wal_path() -> Path:
+    return scheduler_config.CREDENTIALS_FILE.with_suffix(".wal")
+
+
+def _stat_identity(st: os.stat_result) -> list:
+    # A list so it compares equal to a legacy header parsed back from JSON.
+    return [st.st_ino, st.st_size, st.st_mtime_ns]
+
+
+def _cache_key(cred_path: Path, st: os.stat_result, wal_st: os.stat_result | None) -> tuple:
+    wal_id = None if wal_st is None else (wal_st.st_ino, wal_st.st_size, wal_st.st_mtime_ns)
+    return (str(cred_path), st.st_ino, st.st_mtime_ns, st.st_size, wal_id)
+
+
+def _read_raw(path: Path) -> tuple[os.stat_result, bytes | mmap.mmap]:
+    """Read path, returning the stat of the very inode that was read."""
+    with open(path, "rb") as f:
+        st = os.fstat(f.fileno())
+        if st.st_size < _MMAP_MIN_BYTES:
+            # Read then parse: one read() instead of json.load's incremental reads.
+            return st, f.read()
+        return st, mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)
+
+
+def _wal_records(raw: bytes, snap: dict, snap_st: os.stat_result) -> tuple[list[dict] | None, bool]:
+    """
+    Return (records, clean) for a log written on top of snap. records is
+    None if the log belongs to another snapshot; clean is False if it ends
+    in a torn or unreadable record, which is skipped along with anything
+    after it.
+    """
+    lines = raw.split(b"\n")
+    # Snapshots written before WAL_BASE_KEY existed are matched by stat.
+    base = snap.get(WAL_BASE_KEY) or _stat_identity(snap_st)
+    try:
+        if _loads(lines[0]).get("base") != base:
+            return None, False
+    except (json.JSONDecodeError, AttributeError):
+        return None, False
+    records = []
+    # lines[-1] is b"" after a complete record, or a torn append.
+    for line in lines[1:-1]:
+        try:
+            records.append(_loads(line))
+        except json.JSONDecodeError:
+            return records, False
+    return records, lines[-1] == b""
+
+
+def _apply_wal_record(data: dict, record: dict):
+    accounts = data.setdefault("accounts", {})
+    accounts.update(record.get("set", {}))
+    for account_id in record.get("del", []):
+        accounts.pop(account_id, None)
+
+
+def _load_state() -> tuple[dict, Any, os.stat_result | None, int | None]:
+    """
+    Return (credentials, raw merged bytes, snapshot stat, usable log size).
+    The log size is None when the log is missing, stale or torn, meaning the
+    next commit must write a fresh snapshot rather than append to it.
+    """
     cred_path = scheduler_config.CREDENTIALS_FILE
-    if not cred_path.exists():
-        return {"accounts": {}, "oauth_states": {}}
+    wal_path = _wal_path()
+    while True:
+        try:
+            st = os.stat(cred_path)
+        except OSError:
+            return {"accounts": {}, "oauth_states": {}}, None, None, None
+        try:
+            wal_st = os.stat(wal_path)
+        except FileNotFoundError:
+            wal_st = None
+        cached_key, raw, wal_size = _CRED_CACHE["entry"]
+        if cached_key == _cache_key(cred_path, st, wal_st):
+            return _loads(raw), raw, st, wal_size
+
+        st, raw = _read_raw(cred_path)
+        data = _loads(raw)
+        try:
+            wal_st, wal_raw = _read_raw(wal_path)
+        except FileNotFoundError:
+            wal_st, wal_raw = None, b""
+        wal_raw = bytes(wal_raw)
+        records, clean = _wal_records(wal_raw, data, st)
+        wal_size = len(wal_raw) if clean else None
+        if records is None:
+            if wal_st is not None and _stat_identity(os.stat(cred_path)) != _stat_identity(st):
+                continue  # compacted while we read; the log is for the new snapshot
+        else:
+            for record in records:
+                _apply_wal_record(data, record)
+            if records:
+                raw = _dumps(data)
+        _CRED_CACHE["entry"] = (_cache_key(cred_path, st, wal_st), raw, wal_size)
+        return data, raw, st, wal_size
+
+
+def _load_credentials() -> dict:
+    """Load stored credentials (snapshot + log). ASSUMES LOCK IS HELD if used internally."""
     try:
-        with open(cred_path, "r") as f:
-            return json.load(f)
-    except (json.JSONDecodeError, OSError):
+        return _load_state()[0]
+    except (json.JSONDecodeError, OSError, ValueError):
+        # orjson.JSONDecodeError subclasses json.JSONDecodeError.
         return {"accounts": {}, "oauth_states": {}}
 
 
+def _write_all(fd: int, raw: bytes):
+    buf = memoryview(raw)
+    while buf:
+        buf = buf[os.write(fd, buf):]
+
+
+def _fsync_dir(path: Path):
+    """Make a rename inside path durable: the new entry lives in the directory."""
+    fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _replace_file(path: Path, raw: bytes, durable: bool = True) -> os.stat_result:
+    """
+    Atomically swap path's contents for raw via a synced temp file and
+    os.replace, so readers see either the old or the new file, never a
+    truncated one. Returns the stat of the new file.
+
+    fdatasync is enough before the rename: it flushes the data plus the
+    size and block map needed to read it back, skipping only timestamps.
+    The parent directory is always synced after the rename, otherwise a
+    crash can roll the rename back to the old file.
+    durable=False skips only the data sync; a crash may then leave an empty
+    file, so only use it for data that is cheap to lose or that a later
+    fdatasync of the same file will flush.
+    """
+    tmp_path = path.with_name(f"{path.name}.tmp.{os.getpid()}")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        _write_all(fd, raw)
+        if durable:
+            os.fdatasync(fd)
+        st = os.fstat(fd)
+    except BaseException:
+        os.close(fd)
+        os.unlink(tmp_path)
+        raise
+    os.close(fd)
+    os.replace(tmp_path, path)
+    _fsync_dir(path.parent)
+    return st
+
+
 def _save_credentials(data: dict):
-    """Save credentials to JSON file. ASSUMES LOCK IS HELD if used internally."""
+    """
+    Write data as a new snapshot and start an empty log on top of it.
+    Sets data[WAL_BASE_KEY]. ASSUMES LOCK IS HELD if used internally.
+    """
     cred_path = scheduler_config.CREDENTIALS_FILE
     cred_path.parent.mkdir(parents=True, exist_ok=True)
-    with open(cred_path, "w") as f:
-        json.dump(data, f, indent=2)
-        f.flush()
-        os.fsync(f.fileno())
-    os.chmod(str(cred_path), 0o600)
+    # A fresh token on every write, so a stale log never matches a later
+    # snapshot even if its contents happen to equal the old one.
+    data[WAL_BASE_KEY] = secrets.token_hex(8)
+    # Serialize in memory first; json.dump streams many small writes.
+    raw = _dumps(data)
+    st = _replace_file(cred_path, raw)
+    # The log's rename must be durable before any append to it counts as
+    # committed: a crash that rolled it back would leave the old log, whose
+    # base no longer matches, and its records would be dropped. _replace_file
+    # syncs the directory; the header bytes themselves are flushed by the
+    # first _append_wal fdatasync, and an empty log is ignored as stale.
+    header = _dumps_line({"base": data[WAL_BASE_KEY]})
+    wal_st = _replace_file(_wal_path(), header, durable=False)
+    _CRED_CACHE["entry"] = (_cache_key(cred_path, st, wal_st), raw, len(header))
+
+
+def _append_wal(record: dict, data: dict, st: os.stat_result):
+    """Durably append one transaction to the log. ASSUMES LOCK IS HELD."""
+    fd = os.open(_wal_path(), os.O_WRONLY | os.O_APPEND)
+    try:
+        _write_all(fd, _dumps_line(record))
+        os.fdatasync(fd)
+        wal_st = os.fstat(fd)
+    finally:
+        os.close(fd)
+    cred_path = scheduler_config.CREDENTIALS_FILE
+    _CRED_CACHE["entry"] = (_cache_key(cred_path, st, wal_st), _dumps(data), wal_st.st_size)
+
+
+def _commit(base: dict, updated: dict, st: os.stat_result | None, wal_size: int | None):
+    """Persist the difference between base and updated. ASSUMES LOCK IS HELD."""
+    old_accounts = base.get("accounts", {})
+    new_accounts = updated.get("accounts", {})
+    record = {}
+    changed = {aid: acc for aid, acc in new_accounts.items() if old_accounts.get(aid) != acc}
+    if changed:
+        record["set"] = changed
+    deleted = [aid for aid in old_accounts if aid not in new_accounts]
+    if deleted:
+        record["del"] = deleted
+    rest_changed = (
+        {k: v for k, v in updated.items() if k != "accounts"}
+        != {k: v for k, v in base.items() if k != "accounts"}
+    )
+    if not record and not rest_changed and st is not None:
+        return
+    if (
+        rest_changed or st is None or wal_size is None
+        or wal_size > max(WAL_COMPACT_MIN_BYTES, st.st_size)
+    ):
+        _save_credentials(updated)
+    else:
+        _append_wal(record, updated, st)
+
+
+# Long-lived descriptor for the credentials lock file, so a transaction
+# costs no open/close. flock() does not exclude threads sharing one open
+# file description, hence the process-local mutex; the pid check re-opens
+# after fork for the same reason.
+_LOCK_MUTEX = threading.Lock()
+_LOCK_FD: dict[str, Any] = {"path": None, "pid": None, "fd": None}
+
+
+def _lock_fd(lock_path: Path) -> int:
+    """Return the cached lock fd for lock_path. Caller holds _LOCK_MUTEX."""
+    pid = os.getpid()
+    if _LOCK_FD["path"] != lock_path or _LOCK_FD["pid"] != pid:
+        if _LOCK_FD["fd"] is not None and _LOCK_FD["pid"] == pid:
+            os.close(_LOCK_FD["fd"])
+        _LOCK_FD["fd"] = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        _LOCK_FD["path"], _LOCK_FD["pid"] = lock_path, pid
+    return _LOCK_FD["fd"]
 
 
-def _update_creds_transactional(update_fn):
-    """Utility to perform thread-safe and process-safe updates to credentials file."""
+def _fork(base: dict) -> dict:
+    """
+    Copy base deep enough for an update_fn to edit: the top-level dicts and
+    each account record are copied, while field values are shared with
+    base. Several times cheaper than re-parsing the file or deepcopy.
+    """
+    creds = {k: dict(v) if isinstance(v, dict) else v for k, v in base.items()}
+    creds["accounts"] = {aid: dict(acc) for aid, acc in base.get("accounts", {}).items()}
+    return creds
+
+
+def _update_creds_transactional(update_fn, compact: bool = False):
+    """
+    Utility to perform thread-safe and process-safe updates to credentials file.
+    update_fn may add, replace or delete accounts and set an account's
+    fields, but must not mutate nested values in place (see _fork).
+    compact=True always writes a fresh snapshot, folding in the log.
+    """
     cred_path = scheduler_config.CREDENTIALS_FILE
     cred_path.parent.mkdir(parents=True, exist_ok=True)
-    
-    # We use a helper lock file to manage flock, to avoid issues with 'w' mode truncating before lock
+
+    # Saves are atomic renames or log appends, so readers need no lock;
+    # writers still serialize on a helper lock file (a lock on the
+    # credentials file itself would be lost with the inode it belongs to)
+    # to avoid lost updates.
     lock_path = cred_path.with_suffix(".lock")
-    with open(lock_path, "w") as lf:
-        fcntl.flock(lf, fcntl.LOCK_EX)
+    with _LOCK_MUTEX:
+        fd = _lock_fd(lock_path)
+        fcntl.flock(fd, fcntl.LOCK_EX)
         try:
-            creds = _load_credentials()
-            updated_creds = update_fn(creds)
-            _save_credentials(updated_creds)
+            try:
+                base, _, st, wal_size = _load_state()
+            except (json.JSONDecodeError, OSError, ValueError):
+                base, st, wal_size = {"accounts": {}, "oauth_states": {}}, None, None
+            # _commit diffs against base, so update_fn gets its own copy.
+            updated_creds = update_fn(_fork(base))
+            if compact:
+                _save_credentials(updated_creds)
+            else:
+                _commit(base, updated_creds, st, wal_size)
         finally:
-            fcntl.flock(lf, fcntl.LOCK_UN)
+            fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def compact_credentials():
+    """
+    Fold the log into credentials.json so the snapshot alone holds every
+    account. backup.sh calls this before archiving.
+    """
+    _update_creds_transactional(lambda creds: creds, compact=True)
+
+
+# ── OAuth state tokens ──────────────────────────────────────────
+# Pending OAuth states live in an append-only JSON-Lines file next to the
+# credentials, so issuing a URL is one O_APPEND write instead of a full
+# credentials rewrite under the lock. Appenders hold a shared flock on the
+# states file and rewriters an exclusive one; appenders re-open if the file
+# was replaced while they waited. States are not fsync'ed: losing one to a
+# crash only means the user restarts that OAuth flow. Exchanging a code
+# appends a tombstone for its state; refresh_all_tokens compacts consumed
+# and expired states out of the file once per cycle.
+
+def _states_path() -> Path:
+    cred_path = scheduler_config.CREDENTIALS_FILE
+    return cred_path.with_name(cred_path.stem + ".states.jsonl")
+
+
+def _open_states_locked(flags: int, lock: int) -> int:
+    path = _states_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    while True:
+        fd = os.open(path, flags | os.O_CREAT, 0o600)
+        fcntl.flock(fd, lock)
+        try:
+            if os.stat(path).st_ino == os.fstat(fd).st_ino:
+                return fd
+        except FileNotFoundError:
+            pass
+        os.close(fd)
+
+
+def _append_state_record(record: dict, durable: bool = False):
+    fd = _open_states_locked(os.O_WRONLY | os.O_APPEND, fcntl.LOCK_SH)
+    try:
+        _write_all(fd, _dumps_line(record))
+        if durable:
+            os.fdatasync(fd)
+    finally:
+        os.close(fd)
+
+
+def _add_oauth_state(state: str, platform: str):
+    _append_state_record({
+        "state": state,
+        "platform": platform,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    })
+
+
+def _parse_states(raw: bytes) -> tuple[dict[str, dict], int]:
+    """Return (live states, number of lines that a compaction would drop)."""
+    states = {}
+    dead = 0
+    for line in raw.splitlines():
+        try:
+            record = _loads(line)
+            state = record.pop("state")
+        except (json.JSONDecodeError, KeyError, TypeError, AttributeError):
+            dead += 1  # torn or foreign line
+            continue
+        if record.get("consumed"):
+            dead += 1 + (states.pop(state, None) is not None)
+        else:
+            states[state] = record
+    return states, dead
+
+
+def _state_expired(info: dict, cutoff: float) -> bool:
+    try:
+        return datetime.fromisoformat(info["created_at"]).timestamp() < cutoff
+    except (KeyError, TypeError, ValueError):
+        return True
+
+
+def _has_oauth_state(state: str) -> bool:
+    """True if state was issued by generate_*_oauth_url, unexpired and unused."""
+    cutoff = time.time() - scheduler_config.OAUTH_STATE_TTL_SECONDS
+    legacy = _load_credentials().get("oauth_states", {})
+    if state in legacy:
+        # issued before states moved to their own file
+        return not _state_expired(legacy[state], cutoff)
+    try:
+        with open(_states_path(), "rb") as f:
+            info = _parse_states(f.read())[0].get(state)
+    except OSError:
+        return False
+    return info is not None and not _state_expired(info, cutoff)
+
+
+def _consume_oauth_state(state: str):
+    """Tombstone a used state with one synced append; _gc_oauth_states compacts."""
+    _append_state_record({"state": state, "consumed": True}, durable=True)
+
+
+def _gc_oauth_states():
+    """Rewrite the states file without consumed or expired states, if it has any."""
+    if not _states_path().exists():
+        return
+    cutoff = time.time() - scheduler_config.OAUTH_STATE_TTL_SECONDS
+    fd = _open_states_locked(os.O_RDONLY, fcntl.LOCK_EX)
+    try:
+        chunks = []
+        while chunk := os.read(fd, 1 << 16):
+            chunks.append(chunk)
+        states, dead = _parse_states(b"".join(chunks))
+        live = {s: info for s, info in states.items() if not _state_expired(info, cutoff)}
+        if dead or len(live) != len(states):
+            raw = b"".join(_dumps_line({"state": s, **info}) for s, info in live.items())
+            _replace_file(_states_path(), raw, durable=False)
+    finally:
+        os.close(fd)
 
 
 # ── Account management ───────────────────────────────────────────
@@ -96,13 +512,27 @@ def save_account(account_id: str, account_data: dict):
     logger.info("Saved account: %s (%s)", account_id, account_data.get("platform"))
 
 
+def _invalidate(account: dict, reason: str):
+    account["token_valid"] = False
+    account["status"] = "token_invalid"
+    account["invalid_reason"] = reason
+
+
 def mark_account_invalid(account_id: str, reason: str = ""):
     """Mark an account's token as invalid."""
+    # Fast path off the cached read: repeat invalidations (every refresh
+    # failing during an outage) skip the lock and the write entirely.
+    account = get_account(account_id)
+    if account is None or (
+        account.get("token_valid") is False
+        and account.get("status") == "token_invalid"
+        and account.get("invalid_reason") == reason
+    ):
+        return
+
     def _update(creds):
         if account_id in creds.get("accounts", {}):
-            creds["accounts"][account_id]["token_valid"] = False
-            creds["accounts"][account_id]["status"] = "token_invalid"
-            creds["accounts"][account_id]["invalid_reason"] = reason
+            _invalidate(creds["accounts"][account_id], reason)
         return creds
     
     _update_creds_transactional(_update)
@@ -122,6 +552,17 @@ def remove_account(account_id: str) -> bool:
     return removed[0]
 
 
+# ── HTTP ─────────────────────────────────────────────────────────
+# One pooled session for every OAuth call, so refresh cycles reuse TCP/TLS
+# connections to the token endpoints instead of handshaking per request.
+# No automatic retries: the token POSTs spend single-use authorization codes
+# and refresh grants, and a replay after a lost response only surfaces as a
+# misleading invalid_grant that hides the real failure.
+
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16))
+
+
 # ── YouTube OAuth ─────────────────────────────────────────────────
 
 def generate_youtube_oauth_url() -> tuple[str, str]:
@@ -138,18 +579,9 @@ def generate_youtube_oauth_url() -> tuple[str, str]:
             redirect,
         )
 
-    state = secrets.token_urlsafe(32)
-    
-    def _update(creds):
-        creds.setdefault("oauth_states", {})[state] = {
-            "platform": "youtube",
-            "created_at": datetime.now(timezone.utc).isoformat(),
-        }
-        return creds
-    
-    _update_creds_transactional(_update)
+    state = secrets.token_hex(32)
+    _add_oauth_state(state, "youtube")
 
-    import urllib.parse
     params = {
         "client_id": scheduler_config.YOUTUBE_CLIENT_ID,
         "redirect_uri": redirect,
@@ -168,15 +600,12 @@ def exchange_youtube_code(code: str, state: str) -> dict:
     Exchange an authorization code for access + refresh tokens.
     Returns account info dict on success.
     """
-    import requests
-
     # Validate state
-    creds = _load_credentials()
-    if state not in creds.get("oauth_states", {}):
+    if not _has_oauth_state(state):
         return {"error": "invalid_state"}
 
     # Exchange code
-    resp = requests.post("https://oauth2.googleapis.com/token", data={
+    resp = _SESSION.post("https://oauth2.googleapis.com/token", data={
         "code": code,
         "client_id": scheduler_config.YOUTUBE_CLIENT_ID,
         "client_secret": scheduler_config.YOUTUBE_CLIENT_SECRET,
@@ -191,7 +620,7 @@ def exchange_youtube_code(code: str, state: str) -> dict:
 
     # Get channel info
     headers = {"Authorization": f"Bearer {tokens['access_token']}"}
-    ch_resp = requests.get(
+    ch_resp = _SESSION.get(
         "https://www.googleapis.com/youtube/v3/channels",
         params={"part": "snippet", "mine": "true"},
         headers=headers, timeout=15,
@@ -229,25 +658,22 @@ def exchange_youtube_code(code: str, state: str) -> dict:
         return creds
     
     _update_creds_transactional(_update_final)
+    _consume_oauth_state(state)
     logger.info("Saved and cleaned up account: %s", account_id)
 
     return {"account_id": account_id, "account_name": channel_name, "platform": "youtube"}
 
 
-def refresh_youtube_token(account_id: str) -> bool:
-    """Refresh the access token for a YouTube account."""
-    import requests
-
-    account = get_account(account_id)
-    if not account or account.get("platform") != "youtube":
-        return False
-
+def _refreshed_youtube(account: dict) -> tuple[dict | None, str]:
+    """
+    Fetch a new YouTube access token without touching the credentials file.
+    Returns (fields to merge into the account, "") or (None, invalid_reason).
+    """
     refresh_token = account.get("refresh_token")
     if not refresh_token:
-        mark_account_invalid(account_id, "no_refresh_token")
-        return False
+        return None, "no_refresh_token"
 
-    resp = requests.post("https://oauth2.googleapis.com/token", data={
+    resp = _SESSION.post("https://oauth2.googleapis.com/token", data={
         "client_id": scheduler_config.YOUTUBE_CLIENT_ID,
         "client_secret": scheduler_config.YOUTUBE_CLIENT_SECRET,
         "refresh_token": refresh_token,
@@ -255,15 +681,30 @@ def refresh_youtube_token(account_id: str) -> bool:
     }, timeout=15)
 
     if resp.status_code != 200:
-        mark_account_invalid(account_id, f"refresh_failed: {resp.status_code}")
-        return False
+        return None, f"refresh_failed: {resp.status_code}"
 
     tokens = resp.json()
-    account["access_token"] = tokens["access_token"]
-    account["expires_in"] = tokens.get("expires_in", 3600)
-    account["last_refresh"] = datetime.now(timezone.utc).isoformat()
-    account["token_valid"] = True
-    account["status"] = "active"
+    return {
+        "access_token": tokens["access_token"],
+        "expires_in": tokens.get("expires_in", 3600),
+        "last_refresh": datetime.now(timezone.utc).isoformat(),
+        "token_valid": True,
+        "status": "active",
+    }, ""
+
+
+def refresh_youtube_token(account_id: str) -> bool:
+    """Refresh the access token for a YouTube account."""
+    account = get_account(account_id)
+    if not account or account.get("platform") != "youtube":
+        return False
+
+    fields, reason = _refreshed_youtube(account)
+    if fields is None:
+        mark_account_invalid(account_id, reason)
+        return False
+
+    account.update(fields)
     save_account(account_id, account)
     logger.info("Refreshed YouTube token for %s", account_id)
     return True
@@ -273,15 +714,8 @@ def refresh_youtube_token(account_id: str) -> bool:
 
 def generate_instagram_oauth_url() -> tuple[str, str]:
     """Generate an Instagram OAuth authorization URL."""
-    state = secrets.token_urlsafe(32)
-    def _update(creds):
-        creds.setdefault("oauth_states", {})[state] = {
-            "platform": "instagram",
-            "created_at": datetime.now(timezone.utc).isoformat(),
-        }
-        return creds
-    
-    _update_creds_transactional(_update)
+    state = secrets.token_hex(32)
+    _add_oauth_state(state, "instagram")
 
     params = {
         "client_id": scheduler_config.INSTAGRAM_APP_ID,
@@ -290,22 +724,17 @@ def generate_instagram_oauth_url() -> tuple[str, str]:
         "response_type": "code",
         "state": state,
     }
-    url = "https://api.instagram.com/oauth/authorize?" + "&".join(
-        f"{k}={v}" for k, v in params.items()
-    )
+    url = "https://api.instagram.com/oauth/authorize?" + urllib.parse.urlencode(params)
     return url, state
 
 
 def exchange_instagram_code(code: str, state: str) -> dict:
     """Exchange code for Instagram long-lived token."""
-    import requests
-
-    creds = _load_credentials()
-    if state not in creds.get("oauth_states", {}):
+    if not _has_oauth_state(state):
         return {"error": "invalid_state"}
 
     # Step 1: Exchange for short-lived token
-    resp = requests.post("https://api.instagram.com/oauth/access_token", data={
+    resp = _SESSION.post("https://api.instagram.com/oauth/access_token", data={
         "client_id": scheduler_config.INSTAGRAM_APP_ID,
         "client_secret": scheduler_config.INSTAGRAM_APP_SECRET,
         "grant_type": "authorization_code",
@@ -321,7 +750,7 @@ def exchange_instagram_code(code: str, state: str) -> dict:
     user_id = str(short_data.get("user_id", ""))
 
     # Step 2: Exchange for long-lived token
-    resp2 = requests.get("https://graph.instagram.com/access_token", params={
+    resp2 = _SESSION.get("https://graph.instagram.com/access_token", params={
         "grant_type": "ig_exchange_token",
         "client_secret": scheduler_config.INSTAGRAM_APP_SECRET,
         "access_token": short_token,
@@ -336,7 +765,7 @@ def exchange_instagram_code(code: str, state: str) -> dict:
         expires_in = 3600
 
     # Get username
-    me_resp = requests.get(f"https://graph.instagram.com/{user_id}", params={
+    me_resp = _SESSION.get(f"https://graph.instagram.com/{user_id}", params={
         "fields": "id,username",
         "access_token": access_token,
     }, timeout=15)
@@ -366,38 +795,50 @@ def exchange_instagram_code(code: str, state: str) -> dict:
         return creds
     
     _update_creds_transactional(_update_final)
+    _consume_oauth_state(state)
     logger.info("Saved and cleaned up account: %s", account_id)
 
     return {"account_id": account_id, "account_name": username, "platform": "instagram"}
 
 
-def refresh_instagram_token(account_id: str) -> bool:
-    """Refresh a long-lived Instagram token."""
-    import requests
-
-    account = get_account(account_id)
-    if not account or account.get("platform") != "instagram":
-        return False
-
+def _refreshed_instagram(account: dict) -> tuple[dict | None, str]:
+    """
+    Fetch a refreshed long-lived Instagram token without touching the
+    credentials file. Same return contract as _refreshed_youtube.
+    """
     access_token = account.get("access_token")
     if not access_token:
-        mark_account_invalid(account_id, "no_access_token")
-        return False
+        return None, "no_access_token"
 
-    resp = requests.get("https://graph.instagram.com/refresh_access_token", params={
+    resp = _SESSION.get("https://graph.instagram.com/refresh_access_token", params={
         "grant_type": "ig_refresh_token",
         "access_token": access_token,
     }, timeout=15)
 
     if resp.status_code != 200:
-        mark_account_invalid(account_id, f"refresh_failed: {resp.status_code}")
-        return False
+        return None, f"refresh_failed: {resp.status_code}"
 
     data = resp.json()
-    account["access_token"] = data.get("access_token", access_token)
-    account["expires_in"] = data.get("expires_in", 5184000)
-    account["last_refresh"] = datetime.now(timezone.utc).isoformat()
-    account["token_valid"] = True
+    return {
+        "access_token": data.get("access_token", access_token),
+        "expires_in": data.get("expires_in", 5184000),
+        "last_refresh": datetime.now(timezone.utc).isoformat(),
+        "token_valid": True,
+    }, ""
+
+
+def refresh_instagram_token(account_id: str) -> bool:
+    """Refresh a long-lived Instagram token."""
+    account = get_account(account_id)
+    if not account or account.get("platform") != "instagram":
+        return False
+
+    fields, reason = _refreshed_instagram(account)
+    if fields is None:
+        mark_account_invalid(account_id, reason)
+        return False
+
+    account.update(fields)
     save_account(account_id, account)
     logger.info("Refreshed Instagram token for %s", account_id)
     return True
@@ -405,21 +846,82 @@ def refresh_instagram_token(account_id: str) -> bool:
 
 # ── Token refresh scheduler ──────────────────────────────────────
 
+_REFRESHERS = {
+    "youtube": _refreshed_youtube,
+    "instagram": _refreshed_instagram,
+}
+
+
+REFRESH_MAX_WORKERS = 16  # matches the session's per-host pool size
+
+
+def _fetch_refresh(item: tuple[str, dict]) -> tuple[str, dict | None, str]:
+    """Network phase of refresh_all_tokens for one account; never raises."""
+    account_id, info = item
+    try:
+        fields, reason = _REFRESHERS[info.get("platform")](info)
+    except Exception as e:
+        logger.error("Failed to refresh token for %s: %s", account_id, e)
+        fields, reason = None, str(e)
+    return account_id, fields, reason
+
+
 def refresh_all_tokens():
-    """Refresh all tokens that are nearing expiry."""
-    accounts = _load_credentials().get("accounts", {})
-    for account_id, info in accounts.items():
-        if not info.get("token_valid"):
-            continue
-        platform = info.get("platform")
-        try:
-            if platform == "youtube":
-                refresh_youtube_token(account_id)
-            elif platform == "instagram":
-                refresh_instagram_token(account_id)
-        except Exception as e:
-            logger.error("Failed to refresh token for %s: %s", account_id, e)
-            mark_account_invalid(account_id, str(e))
+    """
+    Refresh all tokens that are nearing expiry. The network calls fan out
+    over a thread pool, then every result is applied in a single
+    credentials transaction, so N accounts cost ~1 RTT and one write + fsync.
+    Consumed and expired OAuth states are garbage-collected once per cycle.
+    """
+    try:
+        _gc_oauth_states()
+    except OSError as e:
+        logger.warning("OAuth state cleanup failed: %s", e)
+
+    creds = _load_credentials()
+    accounts = creds.get("accounts", {})
+    cutoff = time.time() - scheduler_config.OAUTH_STATE_TTL_SECONDS
+    expired_legacy = [
+        s for s, info in creds.get("oauth_states", {}).items() if _state_expired(info, cutoff)
+    ]
+    todo = [
+        (account_id, info) for account_id, info in accounts.items()
+        if info.get("token_valid") and info.get("platform") in _REFRESHERS
+    ]
+    if not todo and not expired_legacy:
+        return
+
+    refreshed: dict[str, dict] = {}
+    invalid: dict[str, str] = {}
+    if todo:
+        with ThreadPoolExecutor(max_workers=min(REFRESH_MAX_WORKERS, len(todo))) as pool:
+            for account_id, fields, reason in pool.map(_fetch_refresh, todo):
+                if fields is None:
+                    invalid[account_id] = reason
+                else:
+                    refreshed[account_id] = fields
+
+    def _update(creds):
+        # Accounts removed while we were on the network stay removed.
+        current = creds.get("accounts", {})
+        for account_id, fields in refreshed.items():
+            if account_id in current:
+                current[account_id].update(fields)
+        for account_id, reason in invalid.items():
+            if account_id in current:
+                _invalidate(current[account_id], reason)
+        # States left in the credentials file by older versions expire here,
+        # riding on this cycle's single commit.
+        legacy = creds.get("oauth_states", {})
+        for state in expired_legacy:
+            legacy.pop(state, None)
+        return creds
+
+    _update_creds_transactional(_update)
+    for account_id in refreshed:
+        logger.info("Refreshed %s token for %s", accounts[account_id].get("platform"), account_id)
+    for account_id, reason in invalid.items():
+        logger.warning("Marked account %s as invalid: %s", account_id, reason)
 
 
 def get_access_token(account_id: str) -> str | None:
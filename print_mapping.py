@@ -13,8 +13,9 @@ try:
         range="'destinations_mapping'!A:E",
     ).execute()
     rows = result.get("values", [])
-    print("Destinations Mapping Content:")
-    for row in rows:
-        print(row)
+    # One write for the whole table instead of a print (and flush) per row
+    sys.stdout.write(
+        "Destinations Mapping Content:\n" + "".join(f"{row!r}\n" for row in rows)
+    )
 except Exception as e:
     print(f"Error: {e}")
@@ -3,9 +3,15 @@ queue_db.py — SQLite-backed persistent queue for upload jobs.
 Survives restarts and tracks retry counts.
 """
 
+import atexit
+import contextlib
+import functools
+import os
 import sqlite3
 import logging
-from datetime import datetime, timezone
+import threading
+import time
+from datetime import datetime, timezone, timedelta
 
 import scheduler_config
 
@@ -13,17 +19,96 @@ logger = logging.getLogger(__name__)
 
 DB_PATH = scheduler_config.QUEUE_DB_PATH
 
+_UTC = timezone.utc
+
+
+def _now_iso() -> tuple[str, str]:
+    """Return (ISO-8601 UTC timestamp, YYYY-MM-DD date) from one clock read."""
+    iso = datetime.fromtimestamp(time.time(), _UTC).isoformat()
+    return iso, iso[:10]
+
+
+# Applied once per physical connection. synchronous=NORMAL is safe under WAL
+# (a commit can only be lost to power failure, never corrupted) and drops
+# the fsync from every commit; the rest keep hot pages and temp b-trees in
+# memory and wait out a concurrent writer instead of failing immediately.
+_PRAGMAS = """
+    PRAGMA journal_mode=WAL;
+    PRAGMA synchronous=NORMAL;
+    PRAGMA temp_store=MEMORY;
+    PRAGMA mmap_size=268435456;
+    PRAGMA cache_size=-65536;
+    PRAGMA busy_timeout=5000;
+    PRAGMA wal_autocheckpoint=1000;
+"""
+
 
 def _get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(str(DB_PATH))
+    """Open a new connection. Callers own it and must close it; prefer _conn()."""
+    # sqlite3 keeps prepared statements per connection, keyed by SQL text;
+    # with pooled connections and constant SQL strings every hot helper
+    # reuses its compiled statement. Room for all of them plus variants.
+    conn = sqlite3.connect(str(DB_PATH), cached_statements=256)
     conn.row_factory = sqlite3.Row
-    conn.execute("PRAGMA journal_mode=WAL")
+    conn.create_function("retry_at", 2, _retry_at, deterministic=True)
+    if str(DB_PATH) != ":memory:":
+        conn.executescript(_PRAGMAS)
+    return conn
+
+
+# One long-lived connection per thread, so helpers skip the open, PRAGMA and
+# cold page cache of a fresh connection on every call. Use it as
+# `with _conn() as conn:` — the block commits (or rolls back) but does not
+# close. Re-opened if DB_PATH changes or after fork.
+_local = threading.local()
+
+
+def _conn() -> sqlite3.Connection:
+    key = (str(DB_PATH), os.getpid())
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.key != key:
+        if conn is not None and _local.key[1] == key[1]:
+            conn.close()
+        conn = _local.conn = _get_conn()
+        _local.key = key
     return conn
 
 
+# get_queue_stats is polled by the bot and the scheduler loop; keep its
+# result briefly. Writers that change queue/upload counts use _write_conn(),
+# which drops the cached copy once their transaction has committed.
+STATS_CACHE_TTL_SECONDS = 2.0
+_STATS_CACHE: dict = {}
+
+
+@contextlib.contextmanager
+def _write_conn():
+    with _conn() as conn:
+        yield conn
+    _STATS_CACHE.clear()
+
+
+def _optimize(conn: sqlite3.Connection):
+    """Refresh planner statistics (sqlite_stat1) where SQLite thinks it pays off."""
+    # SQLite < 3.46 has no built-in bound on the ANALYZE work optimize does
+    conn.execute("PRAGMA analysis_limit=400")
+    conn.execute("PRAGMA optimize")
+
+
+@atexit.register
+def _optimize_on_exit():
+    conn = getattr(_local, "conn", None)
+    if conn is None or _local.key != (str(DB_PATH), os.getpid()):
+        return
+    try:
+        _optimize(conn)
+    except sqlite3.Error as e:
+        logger.debug("PRAGMA optimize at exit failed: %s", e)
+
+
 def init_db():
     """Create tables if they don't exist."""
-    conn = _get_conn()
+    conn = _conn()
     conn.executescript("""
         CREATE TABLE IF NOT EXISTS upload_queue (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -86,8 +171,20 @@ def init_db():
             updated_at TEXT NOT NULL
         );
 
-        CREATE INDEX IF NOT EXISTS idx_queue_status ON upload_queue(status);
-        CREATE INDEX IF NOT EXISTS idx_daily_dest ON daily_uploads(dest_account_id, upload_date);
+        -- get_next_jobs: seek on status, walk in ORDER BY order, filter
+        -- next_attempt_after from the index; no temp b-tree sort.
+        -- Its status prefix also serves the old idx_queue_status queries.
+        CREATE INDEX IF NOT EXISTS idx_queue_ready
+            ON upload_queue(status, priority_score DESC, scraped_date ASC, next_attempt_after);
+        DROP INDEX IF EXISTS idx_queue_status;
+        CREATE INDEX IF NOT EXISTS idx_queue_dest_status ON upload_queue(dest_account_id, status);
+        -- get_uploads_today counts from the UNIQUE(dest_account_id, upload_date,
+        -- row_id) autoindex as an index-only scan; a separate
+        -- (dest_account_id, upload_date) index only added write cost.
+        DROP INDEX IF EXISTS idx_daily_dest;
+        -- cleanup_old_records / reset_stale_jobs: range scans on age per status
+        CREATE INDEX IF NOT EXISTS idx_queue_cleanup ON upload_queue(status, updated_at);
+        CREATE INDEX IF NOT EXISTS idx_daily_uploaded_at ON daily_uploads(uploaded_at);
         CREATE INDEX IF NOT EXISTS idx_quota_project ON youtube_quota(project_id, quota_date);
         CREATE INDEX IF NOT EXISTS idx_cleanup_status ON destination_cleanup_jobs(status, next_attempt_after);
         CREATE UNIQUE INDEX IF NOT EXISTS idx_cleanup_active_dest
@@ -95,32 +192,67 @@ def init_db():
             WHERE status IN ('QUEUED', 'IN_PROGRESS');
     """)
     conn.commit()
-    conn.close()
+    _optimize(conn)
     logger.info("Queue DB initialized at %s", DB_PATH)
 
 
+# Hot-path SQL shared by several helpers. sqlite3's per-connection statement
+# cache is keyed by SQL text, so sharing one string also shares one prepared
+# statement between e.g. get_next_jobs and the claim fallback.
+_SQL_ENQUEUE = """INSERT OR IGNORE INTO upload_queue
+    (source_tab, sheet_row, row_id, priority_score, scraped_date,
+     dest_account_id, status, retry_count, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, 'QUEUED', 0, ?, ?)"""
+
+_SQL_NEXT_JOBS = """SELECT * FROM upload_queue
+    WHERE status = 'QUEUED'
+      AND (next_attempt_after IS NULL OR next_attempt_after <= ?)
+    ORDER BY priority_score DESC, scraped_date ASC
+    LIMIT ?"""
+
+_SQL_CLAIM_JOBS = """UPDATE upload_queue
+    SET status='IN_PROGRESS', updated_at=?
+    WHERE id IN (
+        SELECT id FROM upload_queue
+        WHERE status = 'QUEUED'
+          AND (next_attempt_after IS NULL OR next_attempt_after <= ?)
+        ORDER BY priority_score DESC, scraped_date ASC
+        LIMIT ?)
+    RETURNING *"""
+
+
 def enqueue(
     source_tab: str, sheet_row: int, row_id: int,
     priority_score: int = 0, scraped_date: str = "",
     dest_account_id: str = "",
 ) -> bool:
     """Add a row to the upload queue. Returns False if already exists."""
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    try:
-        conn.execute(
-            """INSERT OR IGNORE INTO upload_queue
-               (source_tab, sheet_row, row_id, priority_score, scraped_date,
-                dest_account_id, status, retry_count, created_at, updated_at)
-               VALUES (?, ?, ?, ?, ?, ?, 'QUEUED', 0, ?, ?)""",
+    now, _ = _now_iso()
+    with _write_conn() as conn:
+        cur = conn.execute(
+            _SQL_ENQUEUE,
             (source_tab, sheet_row, row_id, priority_score,
              scraped_date, dest_account_id, now, now),
         )
-        conn.commit()
-        inserted = conn.total_changes > 0
-        return inserted
-    finally:
-        conn.close()
+        # rowcount is per statement (0 when ignored); total_changes would be
+        # cumulative over the pooled connection's lifetime
+        return cur.rowcount == 1
+
+
+def enqueue_many(jobs: list[tuple]) -> int:
+    """
+    Add many rows to the upload queue in one transaction.
+    Each job is (source_tab, sheet_row, row_id, priority_score, scraped_date,
+    dest_account_id). Returns how many were new; existing rows are skipped.
+    """
+    if not jobs:
+        return 0
+    now, _ = _now_iso()
+    with _write_conn() as conn:
+        cur = conn.executemany(_SQL_ENQUEUE, (
+            (*job, now, now) for job in jobs
+        ))
+        return cur.rowcount
 
 
 def get_next_jobs(limit: int = 2) -> list[dict]:
@@ -128,20 +260,49 @@ def get_next_jobs(limit: int = 2) -> list[dict]:
     Get the next jobs to process, ordered by priority (desc), scraped_date (asc).
     Only returns QUEUED jobs whose next_attempt_after has passed.
     """
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    try:
-        rows = conn.execute(
-            """SELECT * FROM upload_queue
-               WHERE status = 'QUEUED'
-                 AND (next_attempt_after IS NULL OR next_attempt_after <= ?)
-               ORDER BY priority_score DESC, scraped_date ASC
-               LIMIT ?""",
-            (now, limit),
-        ).fetchall()
+    now, _ = _now_iso()
+    with _conn() as conn:
+        rows = conn.execute(_SQL_NEXT_JOBS, (now, limit)).fetchall()
         return [dict(r) for r in rows]
-    finally:
-        conn.close()
+
+
+def claim_next_jobs(limit: int = 2) -> list[dict]:
+    """
+    Atomically pick the next ready jobs (same order as get_next_jobs) and
+    mark them IN_PROGRESS, so two workers can never claim the same row.
+    """
+    now, _ = _now_iso()
+    with _write_conn() as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        if sqlite3.sqlite_version_info >= (3, 35):
+            rows = conn.execute(_SQL_CLAIM_JOBS, (now, now, limit)).fetchall()
+        else:
+            rows = conn.execute(_SQL_NEXT_JOBS, (now, limit)).fetchall()
+            conn.executemany(
+                "UPDATE upload_queue SET status='IN_PROGRESS', updated_at=? WHERE id=?",
+                [(now, r["id"]) for r in rows],
+            )
+            rows = [{**dict(r), "status": "IN_PROGRESS", "updated_at": now} for r in rows]
+        jobs = [dict(r) for r in rows]
+    # RETURNING yields rows in no particular order
+    jobs.sort(key=lambda j: (-(j["priority_score"] or 0), j["scraped_date"] or ""))
+    return jobs
+
+
+@functools.lru_cache(maxsize=16)
+def _snapshot_sql(n_statuses: int) -> str:
+    placeholders = ",".join("?" * n_statuses)
+    return f"""SELECT id, source_tab, sheet_row, row_id, dest_account_id, status,
+                      retry_count, next_attempt_after, error_msg, created_at, updated_at
+                 FROM upload_queue
+                WHERE status IN ({placeholders})
+                ORDER BY CASE status
+                           WHEN 'IN_PROGRESS' THEN 0
+                           WHEN 'QUEUED' THEN 1
+                           ELSE 2
+                         END,
+                         id ASC
+                LIMIT ?"""
 
 
 def get_jobs_snapshot(
@@ -154,103 +315,82 @@ def get_jobs_snapshot(
     """
     if not statuses:
         return []
-    placeholders = ",".join("?" for _ in statuses)
-    sql = (
-        f"""SELECT id, source_tab, sheet_row, row_id, dest_account_id, status,
-                   retry_count, next_attempt_after, error_msg, created_at, updated_at
-              FROM upload_queue
-             WHERE status IN ({placeholders})
-             ORDER BY CASE status
-                        WHEN 'IN_PROGRESS' THEN 0
-                        WHEN 'QUEUED' THEN 1
-                        ELSE 2
-                      END,
-                      id ASC
-             LIMIT ?"""
-    )
-    conn = _get_conn()
-    try:
+    # One SQL text per status count, so the connection's statement cache hits
+    sql = _snapshot_sql(len(statuses))
+    with _conn() as conn:
         rows = conn.execute(sql, (*statuses, int(limit))).fetchall()
         return [dict(r) for r in rows]
-    finally:
-        conn.close()
 
 
 def mark_in_progress(queue_id: int):
     """Mark a job as in-progress."""
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
+    now, _ = _now_iso()
+    with _write_conn() as conn:
+        conn.execute(
+            "UPDATE upload_queue SET status='IN_PROGRESS', updated_at=? WHERE id=?",
+            (now, queue_id),
+        )
+
+
+def _mark_completed(conn: sqlite3.Connection, queue_id: int, now: str):
     conn.execute(
-        "UPDATE upload_queue SET status='IN_PROGRESS', updated_at=? WHERE id=?",
+        "UPDATE upload_queue SET status='COMPLETED', updated_at=? WHERE id=?",
         (now, queue_id),
     )
-    conn.commit()
-    conn.close()
 
 
 def mark_completed(queue_id: int):
     """Mark a job as completed (uploaded)."""
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    conn.execute(
-        "UPDATE upload_queue SET status='COMPLETED', updated_at=? WHERE id=?",
-        (now, queue_id),
-    )
-    conn.commit()
-    conn.close()
+    now, _ = _now_iso()
+    with _write_conn() as conn:
+        _mark_completed(conn, queue_id, now)
+
+
+def _retry_at(now_ts: float, retry_count: int) -> str:
+    """Exponential backoff: when attempt `retry_count` may run again."""
+    backoff = scheduler_config.RETRY_BACKOFF_BASE * (3 ** (retry_count - 1))
+    return datetime.fromtimestamp(now_ts + backoff, _UTC).isoformat()
 
 
-def mark_failed(queue_id: int, error_msg: str, max_retries: int = 3):
+def mark_failed(queue_id: int, error_msg: str, max_retries: int = 3) -> str | None:
     """
     Mark a job as failed. Re-queue with backoff if retries remain,
-    otherwise mark as FAILED.
+    otherwise mark as FAILED. Returns the new status (None if no such job).
     """
-    now_dt = datetime.now(timezone.utc)
-    now = now_dt.isoformat()
-    conn = _get_conn()
-    row = conn.execute("SELECT retry_count FROM upload_queue WHERE id=?", (queue_id,)).fetchone()
-    if not row:
-        conn.close()
-        return
+    now_ts = time.time()
+    now = datetime.fromtimestamp(now_ts, _UTC).isoformat()
+    # One statement: SET expressions see the pre-update retry_count
+    sql = """UPDATE upload_queue
+             SET retry_count = retry_count + 1,
+                 status = CASE WHEN retry_count + 1 < :max THEN 'QUEUED' ELSE 'FAILED' END,
+                 next_attempt_after = CASE WHEN retry_count + 1 < :max
+                                           THEN retry_at(:now_ts, retry_count + 1)
+                                           ELSE next_attempt_after END,
+                 error_msg = :err,
+                 updated_at = :now
+             WHERE id = :id"""
+    params = {"max": max_retries, "now_ts": now_ts, "err": error_msg, "now": now, "id": queue_id}
+    with _write_conn() as conn:
+        if sqlite3.sqlite_version_info >= (3, 35):
+            row = conn.execute(sql + " RETURNING status", params).fetchone()
+        else:
+            conn.execute(sql, params)
+            row = conn.execute("SELECT status FROM upload_queue WHERE id=?", (queue_id,)).fetchone()
+        return row["status"] if row else None
 
-    retry_count = row["retry_count"] + 1
-    if retry_count < max_retries:
-        # Exponential backoff
-        from datetime import timedelta
-        backoff = scheduler_config.RETRY_BACKOFF_BASE * (3 ** (retry_count - 1))
-        next_attempt = (now_dt + timedelta(seconds=backoff)).isoformat()
-        conn.execute(
-            """UPDATE upload_queue
-               SET status='QUEUED', retry_count=?, next_attempt_after=?,
-                   error_msg=?, updated_at=?
-               WHERE id=?""",
-            (retry_count, next_attempt, error_msg, now, queue_id),
-        )
-    else:
+
+def requeue_at(queue_id: int, when_dt_iso: str):
+    """Move a job back to QUEUED and set next_attempt_after to a timestamp."""
+    now, _ = _now_iso()
+    with _write_conn() as conn:
         conn.execute(
             """UPDATE upload_queue
-               SET status='FAILED', retry_count=?, error_msg=?, updated_at=?
+               SET status='QUEUED',
+                   next_attempt_after=?,
+                   updated_at=?
                WHERE id=?""",
-            (retry_count, error_msg, now, queue_id),
+            (when_dt_iso, now, queue_id),
         )
-    conn.commit()
-    conn.close()
-
-
-def requeue_at(queue_id: int, when_dt_iso: str):
-    """Move a job back to QUEUED and set next_attempt_after to a timestamp."""
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    conn.execute(
-        """UPDATE upload_queue
-           SET status='QUEUED',
-               next_attempt_after=?,
-               updated_at=?
-           WHERE id=?""",
-        (when_dt_iso, now, queue_id),
-    )
-    conn.commit()
-    conn.close()
 
 
 def cancel_jobs_for_dest(dest_account_id: str) -> int:
@@ -258,9 +398,8 @@ def cancel_jobs_for_dest(dest_account_id: str) -> int:
     Mark all queued/in-progress jobs for a destination as FAILED and clear next attempt.
     Returns number of rows affected.
     """
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    try:
+    now, _ = _now_iso()
+    with _write_conn() as conn:
         cur = conn.execute(
             """UPDATE upload_queue
                SET status='FAILED',
@@ -270,10 +409,7 @@ def cancel_jobs_for_dest(dest_account_id: str) -> int:
                WHERE dest_account_id=? AND status IN ('QUEUED','IN_PROGRESS')""",
             (now, dest_account_id),
         )
-        conn.commit()
         return cur.rowcount
-    finally:
-        conn.close()
 
 
 # ── Destination cleanup jobs ─────────────────────────────────────
@@ -285,42 +421,33 @@ def enqueue_destination_cleanup(
     Queue a destination cleanup job.
     Returns False if an active cleanup job for this destination already exists.
     """
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    try:
-        try:
-            conn.execute(
-                """INSERT INTO destination_cleanup_jobs
-                   (dest_account_id, status, attempt_count, next_attempt_after, last_error,
-                    rows_cleared_total, mappings_disabled_total, queue_canceled_total,
-                    remove_account_after_cleanup, created_at, updated_at)
-                   SELECT ?, 'QUEUED', 0, NULL, NULL, 0, 0, 0, ?, ?, ?
-                   WHERE NOT EXISTS (
-                       SELECT 1 FROM destination_cleanup_jobs
-                       WHERE dest_account_id=?
-                         AND status IN ('QUEUED', 'IN_PROGRESS')
-                   )""",
-                (
-                    dest_account_id,
-                    1 if remove_account_after_cleanup else 0,
-                    now,
-                    now,
-                    dest_account_id,
-                ),
-            )
-        except sqlite3.IntegrityError:
-            return False
-        conn.commit()
-        return conn.total_changes > 0
-    finally:
-        conn.close()
+    now, _ = _now_iso()
+    with _conn() as conn:
+        # The conflict target is the partial unique index idx_cleanup_active_dest,
+        # so an existing active job (or a racing insert) is a silent no-op
+        # rather than an IntegrityError.
+        cur = conn.execute(
+            """INSERT INTO destination_cleanup_jobs
+               (dest_account_id, status, attempt_count, next_attempt_after, last_error,
+                rows_cleared_total, mappings_disabled_total, queue_canceled_total,
+                remove_account_after_cleanup, created_at, updated_at)
+               VALUES (?, 'QUEUED', 0, NULL, NULL, 0, 0, 0, ?, ?, ?)
+               ON CONFLICT(dest_account_id) WHERE status IN ('QUEUED', 'IN_PROGRESS')
+               DO NOTHING""",
+            (
+                dest_account_id,
+                1 if remove_account_after_cleanup else 0,
+                now,
+                now,
+            ),
+        )
+        return cur.rowcount == 1
 
 
 def get_next_destination_cleanup_job() -> dict | None:
     """Return the next cleanup job ready to run, or None."""
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    try:
+    now, _ = _now_iso()
+    with _conn() as conn:
         row = conn.execute(
             """SELECT * FROM destination_cleanup_jobs
                WHERE status='QUEUED'
@@ -330,28 +457,22 @@ def get_next_destination_cleanup_job() -> dict | None:
             (now,),
         ).fetchone()
         return dict(row) if row else None
-    finally:
-        conn.close()
 
 
 def get_destination_cleanup_job(job_id: int) -> dict | None:
     """Fetch a cleanup job by id."""
-    conn = _get_conn()
-    try:
+    with _conn() as conn:
         row = conn.execute(
             "SELECT * FROM destination_cleanup_jobs WHERE id=?",
             (job_id,),
         ).fetchone()
         return dict(row) if row else None
-    finally:
-        conn.close()
 
 
 def mark_destination_cleanup_in_progress(job_id: int) -> None:
     """Mark cleanup job in-progress and increment attempt count."""
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    try:
+    now, _ = _now_iso()
+    with _conn() as conn:
         conn.execute(
             """UPDATE destination_cleanup_jobs
                SET status='IN_PROGRESS',
@@ -360,9 +481,6 @@ def mark_destination_cleanup_in_progress(job_id: int) -> None:
                WHERE id=?""",
             (now, job_id),
         )
-        conn.commit()
-    finally:
-        conn.close()
 
 
 def reschedule_destination_cleanup(
@@ -374,9 +492,8 @@ def reschedule_destination_cleanup(
     rows_cleared = int(counters.get("rows_cleared", 0) or 0)
     mappings_disabled = int(counters.get("mappings_disabled", 0) or 0)
     queue_canceled = int(counters.get("queue_canceled", 0) or 0)
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    try:
+    now, _ = _now_iso()
+    with _conn() as conn:
         conn.execute(
             """UPDATE destination_cleanup_jobs
                SET status='QUEUED',
@@ -397,9 +514,6 @@ def reschedule_destination_cleanup(
                 job_id,
             ),
         )
-        conn.commit()
-    finally:
-        conn.close()
 
 
 def complete_destination_cleanup(job_id: int, counters: dict | None = None) -> None:
@@ -408,9 +522,8 @@ def complete_destination_cleanup(job_id: int, counters: dict | None = None) -> N
     rows_cleared = int(counters.get("rows_cleared", 0) or 0)
     mappings_disabled = int(counters.get("mappings_disabled", 0) or 0)
     queue_canceled = int(counters.get("queue_canceled", 0) or 0)
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    try:
+    now, _ = _now_iso()
+    with _conn() as conn:
         conn.execute(
             """UPDATE destination_cleanup_jobs
                SET status='COMPLETED',
@@ -429,15 +542,11 @@ def complete_destination_cleanup(job_id: int, counters: dict | None = None) -> N
                 job_id,
             ),
         )
-        conn.commit()
-    finally:
-        conn.close()
 
 
 def get_destination_cleanup_stats(limit: int = 20) -> list[dict]:
     """Return recent destination cleanup jobs for status display."""
-    conn = _get_conn()
-    try:
+    with _conn() as conn:
         rows = conn.execute(
             """SELECT * FROM destination_cleanup_jobs
                ORDER BY updated_at DESC, id DESC
@@ -445,22 +554,29 @@ def get_destination_cleanup_stats(limit: int = 20) -> list[dict]:
             (limit,),
         ).fetchall()
         return [dict(r) for r in rows]
-    finally:
-        conn.close()
 
 
 def has_pending_destination_cleanup() -> bool:
     """Return True if any destination cleanup job is queued or in-progress."""
-    conn = _get_conn()
-    try:
+    # Seeks idx_cleanup_status on its status prefix (covering), stopping at
+    # the first match; completed history rows are never visited.
+    with _conn() as conn:
         row = conn.execute(
-            """SELECT 1 FROM destination_cleanup_jobs
-               WHERE status IN ('QUEUED', 'IN_PROGRESS')
-               LIMIT 1"""
+            """SELECT EXISTS(
+                   SELECT 1 FROM destination_cleanup_jobs
+                   WHERE status IN ('QUEUED', 'IN_PROGRESS'))"""
         ).fetchone()
-        return row is not None
-    finally:
-        conn.close()
+        return bool(row[0])
+
+
+@functools.lru_cache(maxsize=16)
+def _destinations_sql(n_statuses: int) -> str:
+    placeholders = ",".join("?" * n_statuses)
+    return f"""SELECT DISTINCT dest_account_id
+                 FROM upload_queue
+                WHERE dest_account_id IS NOT NULL
+                  AND dest_account_id != ''
+                  AND status IN ({placeholders})"""
 
 
 def get_destinations_with_queue_jobs(
@@ -469,120 +585,132 @@ def get_destinations_with_queue_jobs(
     """Return distinct destination ids present in upload_queue for given statuses."""
     if not statuses:
         return []
-    placeholders = ",".join("?" for _ in statuses)
-    conn = _get_conn()
-    try:
-        rows = conn.execute(
-            f"""SELECT DISTINCT dest_account_id
-                FROM upload_queue
-                WHERE dest_account_id IS NOT NULL
-                  AND dest_account_id != ''
-                  AND status IN ({placeholders})""",
-            statuses,
-        ).fetchall()
+    with _conn() as conn:
+        rows = conn.execute(_destinations_sql(len(statuses)), tuple(statuses)).fetchall()
         return [r["dest_account_id"] for r in rows if r["dest_account_id"]]
-    finally:
-        conn.close()
 
 
 # ── Daily upload tracking ─────────────────────────────────────────
 
 def get_uploads_today(dest_account_id: str) -> int:
     """Count how many uploads have been done today for a destination."""
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    conn = _get_conn()
-    try:
+    _, today = _now_iso()
+    with _conn() as conn:
         row = conn.execute(
             "SELECT COUNT(*) as cnt FROM daily_uploads WHERE dest_account_id=? AND upload_date=?",
             (dest_account_id, today),
         ).fetchone()
         return row["cnt"] if row else 0
-    finally:
-        conn.close()
+
+
+def _record_upload(conn: sqlite3.Connection, dest_account_id: str, row_id: int, now: str, today: str):
+    conn.execute(
+        """INSERT OR IGNORE INTO daily_uploads
+           (dest_account_id, upload_date, row_id, uploaded_at)
+           VALUES (?, ?, ?, ?)""",
+        (dest_account_id, today, row_id, now),
+    )
+    # Also update last upload time for spacing
+    conn.execute(
+        """INSERT OR REPLACE INTO last_upload_time
+           (dest_account_id, last_upload_at)
+           VALUES (?, ?)""",
+        (dest_account_id, now),
+    )
 
 
 def record_upload(dest_account_id: str, row_id: int):
     """Record an upload for daily cap tracking."""
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    try:
-        conn.execute(
-            """INSERT OR IGNORE INTO daily_uploads
-               (dest_account_id, upload_date, row_id, uploaded_at)
-               VALUES (?, ?, ?, ?)""",
-            (dest_account_id, today, row_id, now),
-        )
-        # Also update last upload time for spacing
-        conn.execute(
-            """INSERT OR REPLACE INTO last_upload_time
-               (dest_account_id, last_upload_at)
-               VALUES (?, ?)""",
-            (dest_account_id, now),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    now, today = _now_iso()
+    with _write_conn() as conn:
+        _record_upload(conn, dest_account_id, row_id, now, today)
 
 
 def get_last_upload_time(dest_account_id: str) -> str | None:
     """Get the last upload timestamp for a destination."""
-    conn = _get_conn()
-    try:
+    with _conn() as conn:
         row = conn.execute(
             "SELECT last_upload_at FROM last_upload_time WHERE dest_account_id=?",
             (dest_account_id,),
         ).fetchone()
         return row["last_upload_at"] if row else None
-    finally:
-        conn.close()
 
 
 def get_last_upload_time_any() -> str | None:
     """Get the most recent upload timestamp across all destinations."""
-    conn = _get_conn()
-    try:
+    # Read from the DB rather than a process-local copy: uploads are recorded
+    # by the scheduler process while /health asks from the bot process.
+    with _conn() as conn:
         row = conn.execute(
             "SELECT MAX(last_upload_at) as latest FROM last_upload_time"
         ).fetchone()
         return row["latest"] if row and row["latest"] else None
-    finally:
-        conn.close()
 
 
 def get_queue_stats() -> dict:
     """Get queue statistics for admin display."""
-    conn = _get_conn()
-    try:
-        stats = {}
-        for status in ("QUEUED", "IN_PROGRESS", "COMPLETED", "FAILED"):
-            row = conn.execute(
-                "SELECT COUNT(*) as cnt FROM upload_queue WHERE status=?", (status,)
-            ).fetchone()
-            stats[status.lower()] = row["cnt"]
-
-        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+    _, today = _now_iso()
+    key = (str(DB_PATH), today)
+    cached = _STATS_CACHE.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        return dict(cached[1])
+    with _conn() as conn:
+        stats = {"queued": 0, "in_progress": 0, "completed": 0, "failed": 0}
+        rows = conn.execute(
+            """SELECT status, COUNT(*) as cnt
+               FROM upload_queue
+               WHERE status IN ('QUEUED', 'IN_PROGRESS', 'COMPLETED', 'FAILED')
+               GROUP BY status"""
+        ).fetchall()
+        for row in rows:
+            stats[row["status"].lower()] = row["cnt"]
+
         row = conn.execute(
             "SELECT COUNT(*) as cnt FROM daily_uploads WHERE upload_date=?", (today,)
         ).fetchone()
         stats["uploaded_today"] = row["cnt"]
-        return stats
-    finally:
-        conn.close()
+    _STATS_CACHE[key] = (time.monotonic() + STATS_CACHE_TTL_SECONDS, stats)
+    return dict(stats)
+
+
+def get_admin_snapshot() -> dict:
+    """
+    Queue stats and per-destination job counts for admin display, from one
+    grouped scan of upload_queue (plus today's upload count).
+    Returns {"stats": <get_queue_stats() shape>, "destinations": {dest: {status: n}}}.
+    """
+    stats = {"queued": 0, "in_progress": 0, "completed": 0, "failed": 0}
+    destinations: dict[str, dict[str, int]] = {}
+    _, today = _now_iso()
+    with _conn() as conn:
+        rows = conn.execute(
+            """SELECT status, dest_account_id, COUNT(*) as cnt
+               FROM upload_queue
+               WHERE status IN ('QUEUED', 'IN_PROGRESS', 'COMPLETED', 'FAILED')
+               GROUP BY status, dest_account_id"""
+        ).fetchall()
+        row = conn.execute(
+            "SELECT COUNT(*) as cnt FROM daily_uploads WHERE upload_date=?", (today,)
+        ).fetchone()
+    for r in rows:
+        key = r["status"].lower()
+        stats[key] += r["cnt"]
+        if r["dest_account_id"]:
+            destinations.setdefault(r["dest_account_id"], {})[key] = r["cnt"]
+    stats["uploaded_today"] = row["cnt"]
+    return {"stats": stats, "destinations": destinations}
 
 
 def reset_stale_jobs(hours: int = 24):
     """Reset jobs stuck IN_PROGRESS for longer than `hours`."""
-    from datetime import timedelta
-    cutoff = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
-    conn = _get_conn()
-    updated = conn.execute(
-        """UPDATE upload_queue SET status='QUEUED', updated_at=?
-           WHERE status='IN_PROGRESS' AND updated_at < ?""",
-        (datetime.now(timezone.utc).isoformat(), cutoff),
-    ).rowcount
-    conn.commit()
-    conn.close()
+    now_dt = datetime.now(_UTC)
+    cutoff = (now_dt - timedelta(hours=hours)).isoformat()
+    with _write_conn() as conn:
+        updated = conn.execute(
+            """UPDATE upload_queue SET status='QUEUED', updated_at=?
+               WHERE status='IN_PROGRESS' AND updated_at < ?""",
+            (now_dt.isoformat(), cutoff),
+        ).rowcount
     if updated:
         logger.info("Reset %d stale IN_PROGRESS jobs.", updated)
     return updated
@@ -593,9 +721,8 @@ def requeue_failed_status_conflicts() -> int:
     Re-queue rows that failed only due to optimistic-lock status conflicts.
     Useful after transient race conditions or schema-column corrections.
     """
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    try:
+    now, _ = _now_iso()
+    with _write_conn() as conn:
         cur = conn.execute(
             """UPDATE upload_queue
                SET status='QUEUED',
@@ -607,36 +734,70 @@ def requeue_failed_status_conflicts() -> int:
                  AND error_msg LIKE 'status_conflict:%'""",
             (now,),
         )
-        conn.commit()
         return cur.rowcount
-    finally:
-        conn.close()
 
 
-def cleanup_old_records(days: int = 90):
-    """Remove completed/failed records older than `days`."""
-    from datetime import timedelta
-    cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-    conn = _get_conn()
-    conn.execute(
-        "DELETE FROM upload_queue WHERE status IN ('COMPLETED','FAILED') AND updated_at < ?",
+# Rows deleted per transaction by cleanup_old_records; small batches keep
+# each commit's WAL growth bounded and let readers in between.
+CLEANUP_BATCH_SIZE = 1000
+
+
+def _delete_in_batches(sql: str, params: tuple) -> int:
+    deleted = 0
+    while True:
+        with _write_conn() as conn:
+            n = conn.execute(sql, (*params, CLEANUP_BATCH_SIZE)).rowcount
+        deleted += n
+        if n < CLEANUP_BATCH_SIZE:
+            return deleted
+
+
+def cleanup_old_records(days: int = 90) -> int:
+    """
+    Remove completed/failed jobs, upload history and quota counters older
+    than `days`. Returns rows deleted.
+    """
+    cutoff = (datetime.now(_UTC) - timedelta(days=days)).isoformat()
+    deleted = _delete_in_batches(
+        """DELETE FROM upload_queue WHERE id IN (
+               SELECT id FROM upload_queue
+               WHERE status IN ('COMPLETED','FAILED') AND updated_at < ?
+               LIMIT ?)""",
         (cutoff,),
     )
-    conn.execute("DELETE FROM daily_uploads WHERE uploaded_at < ?", (cutoff,))
-    conn.commit()
-    conn.close()
+    deleted += _delete_in_batches(
+        """DELETE FROM daily_uploads WHERE id IN (
+               SELECT id FROM daily_uploads WHERE uploaded_at < ? LIMIT ?)""",
+        (cutoff,),
+    )
+    # Per-day quota counters are only read for today; keep the same window
+    deleted += _delete_in_batches(
+        """DELETE FROM youtube_quota WHERE id IN (
+               SELECT id FROM youtube_quota WHERE quota_date < ? LIMIT ?)""",
+        (cutoff[:10],),
+    )
+    if deleted >= CLEANUP_BATCH_SIZE:
+        # Hand the freed WAL space back instead of leaving a large -wal file
+        _conn().execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    if deleted:
+        logger.info("Cleaned up %d old queue/upload records.", deleted)
+    return deleted
 
 
 # ── YouTube Quota Tracking (#2) ──────────────────────────────────
 
+# get_cheapest_project runs once per upload; keep the per-project usage it
+# reads for a few seconds. Dropped whenever this process records usage.
+QUOTA_CACHE_TTL_SECONDS = 5.0
+_QUOTA_CACHE: dict = {}
+
+
 def record_quota_usage(project_id: str, units: int = 0):
     """Record quota units used for a YouTube project today."""
     if units <= 0:
         units = scheduler_config.YT_QUOTA_UNITS_PER_UPLOAD
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    try:
+    now, today = _now_iso()
+    with _conn() as conn:
         conn.execute(
             """INSERT INTO youtube_quota (project_id, quota_date, units_used, updated_at)
                VALUES (?, ?, ?, ?)
@@ -644,25 +805,47 @@ def record_quota_usage(project_id: str, units: int = 0):
                DO UPDATE SET units_used = units_used + ?, updated_at = ?""",
             (project_id, today, units, now, units, now),
         )
-        conn.commit()
-    finally:
-        conn.close()
+    _QUOTA_CACHE.clear()
+
+
+def _quota_limit() -> int:
+    return int(scheduler_config.YT_QUOTA_LIMIT_PER_PROJECT * scheduler_config.QUOTA_SAFETY_MARGIN)
 
 
 def get_quota_remaining(project_id: str) -> int:
     """Get remaining YouTube quota units for a project today."""
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    limit = int(scheduler_config.YT_QUOTA_LIMIT_PER_PROJECT * scheduler_config.QUOTA_SAFETY_MARGIN)
-    conn = _get_conn()
-    try:
+    _, today = _now_iso()
+    with _conn() as conn:
         row = conn.execute(
             "SELECT units_used FROM youtube_quota WHERE project_id=? AND quota_date=?",
             (project_id, today),
         ).fetchone()
         used = row["units_used"] if row else 0
-        return max(0, limit - used)
-    finally:
-        conn.close()
+        return max(0, _quota_limit() - used)
+
+
+def get_quota_remaining_batch(project_ids: list[str]) -> dict[str, int]:
+    """Get remaining YouTube quota units today for several projects in one query."""
+    if not project_ids:
+        return {}
+    _, today = _now_iso()
+    pids = tuple(project_ids)
+    key = (str(DB_PATH), today, pids)
+    cached = _QUOTA_CACHE.get(key)
+    if cached is not None and cached[0] > time.monotonic():
+        used = cached[1]
+    else:
+        placeholders = ",".join("?" for _ in pids)
+        with _conn() as conn:
+            rows = conn.execute(
+                f"""SELECT project_id, units_used FROM youtube_quota
+                    WHERE quota_date=? AND project_id IN ({placeholders})""",
+                (today, *pids),
+            ).fetchall()
+        used = {r["project_id"]: r["units_used"] for r in rows}
+        _QUOTA_CACHE[key] = (time.monotonic() + QUOTA_CACHE_TTL_SECONDS, used)
+    limit = _quota_limit()
+    return {pid: max(0, limit - used.get(pid, 0)) for pid in pids}
 
 
 def get_cheapest_project() -> str | None:
@@ -670,14 +853,10 @@ def get_cheapest_project() -> str | None:
     projects = scheduler_config.YT_PROJECT_KEYS
     if not projects:
         return "default"  # Single project mode
-    best_id = None
-    best_remaining = -1
-    for pid in projects:
-        remaining = get_quota_remaining(pid)
-        if remaining > best_remaining:
-            best_remaining = remaining
-            best_id = pid
-    if best_remaining < scheduler_config.YT_QUOTA_UNITS_PER_UPLOAD:
+    remaining = get_quota_remaining_batch(projects)
+    # max() keeps the first of equal candidates, as the old loop did
+    best_id = max(projects, key=remaining.__getitem__)
+    if remaining[best_id] < scheduler_config.YT_QUOTA_UNITS_PER_UPLOAD:
         return None  # All projects exhausted
     return best_id
 
@@ -686,25 +865,46 @@ def get_cheapest_project() -> str | None:
 
 def check_idempotency(idem_key: str) -> bool:
     """Return True if this upload was already completed (prevent doubles)."""
-    conn = _get_conn()
-    try:
+    with _conn() as conn:
         row = conn.execute(
             "SELECT 1 FROM idempotency_keys WHERE idem_key=?", (idem_key,)
         ).fetchone()
         return row is not None
-    finally:
-        conn.close()
+
+
+def _record_idempotency(conn: sqlite3.Connection, idem_key: str, queue_id: int, now: str) -> bool:
+    cur = conn.execute(
+        "INSERT OR IGNORE INTO idempotency_keys (idem_key, queue_id, completed_at) VALUES (?, ?, ?)",
+        (idem_key, queue_id, now),
+    )
+    return cur.rowcount == 1
+
+
+def claim_idempotency(idem_key: str, queue_id: int) -> bool:
+    """
+    Record an idempotency key in one atomic statement.
+    Returns True if the key was new, False if it was already recorded.
+    """
+    now, _ = _now_iso()
+    with _conn() as conn:
+        return _record_idempotency(conn, idem_key, queue_id, now)
 
 
 def record_idempotency(idem_key: str, queue_id: int):
     """Record a completed upload's idempotency key."""
-    now = datetime.now(timezone.utc).isoformat()
-    conn = _get_conn()
-    try:
-        conn.execute(
-            "INSERT OR IGNORE INTO idempotency_keys (idem_key, queue_id, completed_at) VALUES (?, ?, ?)",
-            (idem_key, queue_id, now),
-        )
-        conn.commit()
-    finally:
-        conn.close()
+    claim_idempotency(idem_key, queue_id)
+
+
+def finalize_upload(queue_id: int, dest_account_id: str, row_id: int, idem_key: str) -> bool:
+    """
+    Mark a job completed, record it for daily cap/spacing and store its
+    idempotency key, all in one transaction (one commit instead of three).
+    Returns False if the idempotency key had already been recorded.
+    """
+    now, today = _now_iso()
+    with _write_conn() as conn:
+        # Take the write lock up front rather than upgrading mid-transaction
+        conn.execute("BEGIN IMMEDIATE")
+        _mark_completed(conn, queue_id, now)
+        _record_upload(conn, dest_account_id, row_id, now, today)
+        return _record_idempotency(conn, idem_key, queue_id, now)
@@ -5,12 +5,8 @@ from dotenv import load_dotenv
 load_dotenv("/home/ubuntu/gravix-agent/.env")
 import queue_db
 
-conn = queue_db._get_conn()
-try:
-    print("Deleting ALL jobs from upload_queue...")
-    conn.execute("DELETE FROM upload_queue")
-    conn.execute("DELETE FROM idempotency_keys")
-    conn.commit()
-    print(f"Deleted {conn.total_changes} rows (combined).")
-finally:
-    conn.close()
+print("Deleting ALL jobs from upload_queue...")
+with queue_db._conn() as conn:
+    deleted = conn.execute("DELETE FROM upload_queue").rowcount
+    deleted += conn.execute("DELETE FROM idempotency_keys").rowcount
+print(f"Deleted {deleted} rows (combined).")
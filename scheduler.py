@@ -401,7 +401,7 @@ def poll_and_enqueue(sheets=None):
 
     ready_rows = sheet_manager.read_ready_rows(sheets)
 
-    enqueued = 0
+    to_enqueue = []
     skipped_cap = 0
     skipped_flag = 0
     skipped_schedule = 0
@@ -470,17 +470,12 @@ def poll_and_enqueue(sheets=None):
                 skipped_cap += 1
                 continue
 
-        # Enqueue
-        added = queue_db.enqueue(
-            source_tab=tab_name,
-            sheet_row=sheet_row,
-            row_id=row_id,
-            priority_score=priority,
-            scraped_date=row.get("scraped_date_utc", ""),
-            dest_account_id=dest,
+        to_enqueue.append(
+            (tab_name, sheet_row, row_id, priority, row.get("scraped_date_utc", ""), dest)
         )
-        if added:
-            enqueued += 1
+
+    # Enqueue everything in one transaction; rows already queued are skipped
+    enqueued = queue_db.enqueue_many(to_enqueue)
 
     logger.info(
         "Poll: %d ready rows, %d enqueued, %d capped, %d flagged, %d scheduled, %d max-attempt, %d promoted.",
@@ -518,8 +513,7 @@ def process_upload_job(job: dict) -> dict:
 
     sheets = sheet_manager.get_service()
 
-    # Step 1: Lock row (mark IN_PROGRESS)
-    queue_db.mark_in_progress(queue_id)
+    # Step 1: Lock row (already IN_PROGRESS in the queue via claim_next_jobs)
     try:
         sheet_manager.update_row_status(
             tab_name, sheet_row, "IN_PROGRESS", sheets=sheets, expected_status="READY_TO_UPLOAD"
@@ -711,7 +705,10 @@ def process_upload_job(job: dict) -> dict:
     upload_file = ff_result["output_path"]
 
     # Step 7: Validate for platform
-    validation = ffmpeg_worker.validate_for_upload(upload_file, platform)
+    validation = ffmpeg_worker.validate_for_upload(
+        upload_file, platform,
+        probe=(ff_result["duration"], ff_result["width"], ff_result["height"]),
+    )
     if not validation["valid"]:
         error = f"validation_failed: {validation['error']}"
         download_manager.cleanup_file(video_path)
@@ -786,10 +783,12 @@ def process_upload_job(job: dict) -> dict:
     download_manager.cleanup_file(upload_file)
 
     if upload_result.success:
-        queue_db.mark_completed(queue_id)
-        queue_db.record_upload(dest_account_id, row_id)
-        # S1: Record idempotency key after successful upload
-        queue_db.record_idempotency(idem_key, queue_id)
+        # S1: Record idempotency key with the completion, in one commit
+        if not queue_db.finalize_upload(queue_id, dest_account_id, row_id, idem_key):
+            logger.warning(
+                "Idempotency key for job %d was already recorded: concurrent duplicate upload to %s",
+                queue_id, dest_account_id,
+            )
         # S4: Record quota usage for YouTube
         if platform == "youtube":
             queue_db.record_quota_usage(
@@ -930,7 +929,7 @@ def run_workers(max_workers: int | None = None):
     """Pull jobs from queue and process them with a thread pool."""
     worker_count = max_workers or scheduler_config.MAX_CONCURRENT_WORKERS
     worker_count = max(1, int(worker_count))
-    jobs = queue_db.get_next_jobs(limit=worker_count)
+    jobs = queue_db.claim_next_jobs(limit=worker_count)
     if not jobs:
         return 0
 
@@ -40,6 +40,7 @@ YOUTUBE_CLIENT_ID = os.getenv("YOUTUBE_CLIENT_ID", "")
 YOUTUBE_CLIENT_SECRET = os.getenv("YOUTUBE_CLIENT_SECRET", "")
 YOUTUBE_REDIRECT_URI = os.getenv("YOUTUBE_REDIRECT_URI", "http://localhost:8090/oauth/callback")
 OAUTH_REQUIRE_HTTPS = os.getenv("OAUTH_REQUIRE_HTTPS", "true").lower() == "true"
+OAUTH_STATE_TTL_SECONDS = int(os.getenv("OAUTH_STATE_TTL_SECONDS", "86400"))  # unused OAuth states are dropped after this
 
 # ── YouTube Quota (#2) ───────────────────────────────────────────
 YT_QUOTA_LIMIT_PER_PROJECT = int(os.getenv("YT_QUOTA_LIMIT_PER_PROJECT", "10000"))
@@ -54,6 +55,7 @@ INSTANCE_ID = os.getenv("INSTANCE_ID", "scheduler_01")
 # ── Scheduler ─────────────────────────────────────────────────────
 POLL_INTERVAL_SECONDS = 60          # how often to check sheet
 MAX_CONCURRENT_WORKERS = 4          # concurrent upload workers
+MAX_CONCURRENT_DOWNLOADS = int(os.getenv("MAX_CONCURRENT_DOWNLOADS", "4"))  # async yt-dlp processes
 UPLOADS_PER_DAY_PER_DEST = 2       # daily cap per destination account
 UPLOAD_SPACING_SECONDS = 600       # 10 min between uploads to same dest
 STALE_IN_PROGRESS_HOURS = 2        # reset rows stuck IN_PROGRESS after 2h
@@ -95,6 +97,9 @@ FFMPEG_FALLBACK_CMD = (
     '-crf 23 -c:a aac -b:a 96k "{output}"'
 )
 
+HWACCEL = os.getenv("HWACCEL", "none").lower()   # none | nvenc | vaapi | qsv
+VAAPI_DEVICE = os.getenv("VAAPI_DEVICE", "/dev/dri/renderD128")
+
 MAX_SHORTS_DURATION = 60            # YouTube Shorts limit
 
 # ── Video Branding (#3) ──────────────────────────────────────────
@@ -493,15 +493,24 @@ def _parse_instagram_html(html: str, source_id: str, max_results: int | None) ->
 
 # ── Download & hash ───────────────────────────────────────────────
 
+_ytdlp_bin: str | None = None
+
+
 def _resolve_ytdlp_bin() -> str | None:
-    """Resolve yt-dlp binary from PATH or local venv."""
+    """
+    Resolve yt-dlp binary from PATH or local venv.
+    The result is cached once found; a miss is retried on the next call.
+    """
+    global _ytdlp_bin
+    if _ytdlp_bin is not None:
+        return _ytdlp_bin
     found = shutil.which("yt-dlp")
-    if found:
-        return found
-    venv_bin = Path(__file__).parent / "venv" / "bin" / "yt-dlp"
-    if venv_bin.exists():
-        return str(venv_bin)
-    return None
+    if not found:
+        venv_bin = Path(__file__).parent / "venv" / "bin" / "yt-dlp"
+        if venv_bin.exists():
+            found = str(venv_bin)
+    _ytdlp_bin = found
+    return found
 
 def _check_disk_space() -> bool:
     """Return True if disk has enough free space."""
@@ -82,6 +82,9 @@ DISK_MIN_FREE_PERCENT = 10             # stop downloads if below
 # ── Download limits ───────────────────────────────────────────────
 MAX_FILE_SIZE_MB = 100                  # skip files larger than this
 HASH_HEADTAIL_THRESHOLD_MB = 50        # use headtail if > this
+# sha256 | blake3 | xxh3 — non-default algos need `pip install blake3` / `xxhash`
+# and produce hashes that do not match rows already fingerprinted with sha256
+HASH_ALGO = os.getenv("HASH_ALGO", "sha256").lower()
 
 # ── Logging ───────────────────────────────────────────────────────
 LOG_DIR = Path(__file__).parent / "logs"
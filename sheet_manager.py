@@ -3,7 +3,9 @@ sheet_manager.py — Unified Google Sheets read/write wrapper for Part 3.
 Provides safe, centralized access with audit logging.
 """
 
+import functools
 import logging
+import threading
 from datetime import datetime, timezone
 from typing import Any
 
@@ -17,14 +19,26 @@ logger = logging.getLogger(__name__)
 ROW_READ_RANGE = "A:AZ"
 
 
-def get_service():
-    """Authenticate and return Sheets API spreadsheets resource."""
-    creds = Credentials.from_service_account_file(
+@functools.lru_cache(maxsize=1)
+def _credentials() -> Credentials:
+    return Credentials.from_service_account_file(
         scheduler_config.GOOGLE_SVC_JSON,
         scopes=scheduler_config.SHEETS_SCOPES,
     )
-    service = build("sheets", "v4", credentials=creds, cache_discovery=False)
-    return service.spreadsheets()
+
+
+# The Resource's httplib2 transport is not thread-safe, so the built
+# service is memoized per thread (upload workers each get their own).
+_service_local = threading.local()
+
+
+def get_service():
+    """Authenticate and return Sheets API spreadsheets resource."""
+    sheets = getattr(_service_local, "sheets", None)
+    if sheets is None:
+        service = build("sheets", "v4", credentials=_credentials(), cache_discovery=False)
+        sheets = _service_local.sheets = service.spreadsheets()
+    return sheets
 
 
 def _now_utc() -> str:
@@ -156,14 +156,9 @@ def read_pending_rows(sheets=None) -> list[dict[str, Any]]:
     return pending
 
 
-def write_row_results(sheet_row: int, data: dict[str, Any], sheets=None):
-    """
-    Write AI outputs and agent metadata to a specific row.
-    sheet_row is 1-indexed (the actual row number in the spreadsheet).
-    """
-    sheets = sheets or get_service()
-
-    # Build the update for columns H–Y (indices 7–24)
+def _result_ranges(sheet_row: int, data: dict[str, Any]) -> list[dict[str, Any]]:
+    """Build the H–S and V–Y value ranges for one processed row."""
+    # Columns H–S (indices 7–18)
     update_values = [
         str(data.get("ai_title", "")),
         str(data.get("ai_description", "")),
@@ -180,44 +175,94 @@ def write_row_results(sheet_row: int, data: dict[str, Any], sheets=None):
         # Skip T (thumbnail_url) and U (content_hash) — those are input cols
     ]
 
-    # Write H–S (columns 8–19 → H:S)
-    range_hs = f"{config.SHEET_NAME}!H{sheet_row}:S{sheet_row}"
-    sheets.values().update(
-        spreadsheetId=config.SPREADSHEET_ID,
-        range=range_hs,
-        valueInputOption="RAW",
-        body={"values": [update_values]},
-    ).execute()
-
-    # Write V–Y (status, processed_at, agent_version, error_log)
+    # V–Y (status, processed_at, agent_version, error_log)
     meta_values = [
         str(data.get("status", "DONE")),
         str(data.get("processed_at", "")),
         str(data.get("agent_version", "")),
         str(data.get("error_log", "")),
     ]
-    range_vy = f"{config.SHEET_NAME}!V{sheet_row}:Y{sheet_row}"
-    sheets.values().update(
+    return [
+        {"range": f"{config.SHEET_NAME}!H{sheet_row}:S{sheet_row}", "values": [update_values]},
+        {"range": f"{config.SHEET_NAME}!V{sheet_row}:Y{sheet_row}", "values": [meta_values]},
+    ]
+
+
+def write_rows_results(rows: list[tuple[int, dict[str, Any]]], sheets=None):
+    """
+    Write AI outputs for many rows in a single values.batchUpdate call.
+    rows is a list of (sheet_row, data) pairs; sheet_row is 1-indexed.
+    """
+    if not rows:
+        return
+    sheets = sheets or get_service()
+
+    data = []
+    for sheet_row, result in rows:
+        data.extend(_result_ranges(sheet_row, result))
+
+    sheets.values().batchUpdate(
         spreadsheetId=config.SPREADSHEET_ID,
-        range=range_vy,
-        valueInputOption="RAW",
-        body={"values": [meta_values]},
+        body={"valueInputOption": "RAW", "data": data},
+    ).execute()
+
+    logger.info("Wrote results to %d row(s) in one batch.", len(rows))
+
+
+def write_row_results(sheet_row: int, data: dict[str, Any], sheets=None):
+    """
+    Write AI outputs and agent metadata to a specific row.
+    sheet_row is 1-indexed (the actual row number in the spreadsheet).
+    """
+    sheets = sheets or get_service()
+    sheets.values().batchUpdate(
+        spreadsheetId=config.SPREADSHEET_ID,
+        body={"valueInputOption": "RAW", "data": _result_ranges(sheet_row, data)},
     ).execute()
 
     logger.info("Wrote results to row %d (status=%s).", sheet_row, data.get("status", "DONE"))
 
 
+def _error_range(sheet_row: int, error_msg: str, now: str) -> dict[str, Any]:
+    """Build the V–Y value range that marks one row as ERROR."""
+    return {
+        "range": f"{config.SHEET_NAME}!V{sheet_row}:Y{sheet_row}",
+        "values": [["ERROR", now, config.HEADERS[-2], error_msg]],
+    }
+
+
+def write_errors(rows: list[tuple[int, str]], sheets=None):
+    """
+    Mark many rows as ERROR in a single values.batchUpdate call.
+    rows is a list of (sheet_row, error_msg) pairs.
+    """
+    if not rows:
+        return
+    sheets = sheets or get_service()
+    from datetime import datetime, timezone
+
+    now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+    sheets.values().batchUpdate(
+        spreadsheetId=config.SPREADSHEET_ID,
+        body={
+            "valueInputOption": "RAW",
+            "data": [_error_range(r, msg, now) for r, msg in rows],
+        },
+    ).execute()
+    logger.warning("Marked %d row(s) as ERROR in one batch.", len(rows))
+
+
 def write_error(sheet_row: int, error_msg: str, sheets=None):
     """Mark a row as ERROR and write the error message."""
     sheets = sheets or get_service()
     from datetime import datetime, timezone
 
     now = datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
-    range_vy = f"{config.SHEET_NAME}!V{sheet_row}:Y{sheet_row}"
+    err = _error_range(sheet_row, error_msg, now)
     sheets.values().update(
         spreadsheetId=config.SPREADSHEET_ID,
-        range=range_vy,
+        range=err["range"],
         valueInputOption="RAW",
-        body={"values": [["ERROR", now, config.HEADERS[-2], error_msg]]},
+        body={"values": err["values"]},
     ).execute()
     logger.warning("Marked row %d as ERROR: %s", sheet_row, error_msg[:80])
@@ -7,6 +7,7 @@ No API keys or network access required.
 import sys
 import os
 import tempfile
+import shutil
 import sqlite3
 import json
 from datetime import datetime
@@ -121,6 +122,60 @@ def test_queue_lifecycle():
         queue_db.DB_PATH = original_path
 
 
+def test_queue_enqueue_many():
+    """Test bulk enqueue counts only new rows."""
+    import queue_db
+    original_path = queue_db.DB_PATH
+    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
+        queue_db.DB_PATH = f.name
+
+    try:
+        queue_db.init_db()
+        queue_db.enqueue("source__test", 2, 1)
+        added = queue_db.enqueue_many([
+            ("source__test", 2, 1, 0, "", ""),
+            ("source__test", 3, 2, 5, "2024-01-01", "yt_123"),
+            ("source__test", 4, 3, 0, "", "yt_123"),
+        ])
+        assert added == 2
+        assert queue_db.enqueue_many([]) == 0
+        jobs = queue_db.get_next_jobs(limit=5)
+        assert len(jobs) == 3
+        assert jobs[0]["row_id"] == 2 and jobs[0]["dest_account_id"] == "yt_123"
+        print("  PASS: Bulk enqueue")
+    finally:
+        os.unlink(queue_db.DB_PATH)
+        queue_db.DB_PATH = original_path
+
+
+def test_queue_claim_next_jobs():
+    """Test atomic claim: ordered like get_next_jobs, never handed out twice."""
+    import queue_db
+    original_path = queue_db.DB_PATH
+    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
+        queue_db.DB_PATH = f.name
+
+    try:
+        queue_db.init_db()
+        queue_db.enqueue("source__test", 2, 1, priority_score=10, scraped_date="2024-01-02")
+        queue_db.enqueue("source__test", 3, 2, priority_score=50, scraped_date="2024-01-03")
+        queue_db.enqueue("source__test", 4, 3, priority_score=10, scraped_date="2024-01-01")
+        expected = [j["row_id"] for j in queue_db.get_next_jobs(limit=2)]
+
+        claimed = queue_db.claim_next_jobs(limit=2)
+        assert [j["row_id"] for j in claimed] == expected == [2, 3]
+        assert all(j["status"] == "IN_PROGRESS" for j in claimed)
+
+        rest = queue_db.claim_next_jobs(limit=2)
+        assert [j["row_id"] for j in rest] == [1]
+        assert queue_db.claim_next_jobs(limit=2) == []
+        assert queue_db.get_queue_stats()["in_progress"] == 3
+        print("  PASS: Atomic claim of next jobs")
+    finally:
+        os.unlink(queue_db.DB_PATH)
+        queue_db.DB_PATH = original_path
+
+
 def test_queue_retry_backoff():
     """Test retry with exponential backoff."""
     import queue_db
@@ -135,7 +190,7 @@ def test_queue_retry_backoff():
         job_id = jobs[0]["id"]
 
         # Fail once — should be re-queued with backoff
-        queue_db.mark_failed(job_id, "test_error", max_retries=3)
+        assert queue_db.mark_failed(job_id, "test_error", max_retries=3) == "QUEUED"
         conn = sqlite3.connect(queue_db.DB_PATH)
         conn.row_factory = sqlite3.Row
         row = conn.execute("SELECT * FROM upload_queue WHERE id=?", (job_id,)).fetchone()
@@ -146,19 +201,113 @@ def test_queue_retry_backoff():
 
         # Fail twice more — should be FAILED
         queue_db.mark_failed(job_id, "test_error_2", max_retries=3)
-        queue_db.mark_failed(job_id, "test_error_3", max_retries=3)
+        assert queue_db.mark_failed(job_id, "test_error_3", max_retries=3) == "FAILED"
         conn = sqlite3.connect(queue_db.DB_PATH)
         conn.row_factory = sqlite3.Row
         row = conn.execute("SELECT * FROM upload_queue WHERE id=?", (job_id,)).fetchone()
         assert row["status"] == "FAILED"
         assert row["retry_count"] == 3
         conn.close()
+        assert queue_db.mark_failed(job_id + 100, "missing", max_retries=3) is None
         print("  PASS: Retry backoff (3 attempts → FAILED)")
     finally:
         os.unlink(queue_db.DB_PATH)
         queue_db.DB_PATH = original_path
 
 
+def test_admin_snapshot():
+    """Test grouped admin snapshot matches the per-purpose helpers."""
+    import queue_db
+    original_path = queue_db.DB_PATH
+    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
+        queue_db.DB_PATH = f.name
+
+    try:
+        queue_db.init_db()
+        queue_db.enqueue("source__test", 2, 1, dest_account_id="yt_a")
+        queue_db.enqueue("source__test", 3, 2, dest_account_id="yt_a")
+        queue_db.enqueue("source__test", 4, 3, dest_account_id="yt_b")
+        queue_db.enqueue("source__test", 5, 4)
+        job = queue_db.claim_next_jobs(1)[0]
+        queue_db.mark_failed(job["id"], "boom", max_retries=0)
+
+        snap = queue_db.get_admin_snapshot()
+        assert snap["stats"] == queue_db.get_queue_stats()
+        assert snap["stats"]["queued"] == 3 and snap["stats"]["failed"] == 1
+        assert sorted(snap["destinations"]) == sorted(queue_db.get_destinations_with_queue_jobs())
+        assert sum(sum(c.values()) for c in snap["destinations"].values()) == 3
+        print("  PASS: Admin snapshot (grouped stats + destinations)")
+    finally:
+        os.unlink(queue_db.DB_PATH)
+        queue_db.DB_PATH = original_path
+
+
+def test_queue_stats_cache():
+    """Test get_queue_stats TTL cache and its invalidation by queue writes."""
+    import queue_db
+    original_path = queue_db.DB_PATH
+    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
+        queue_db.DB_PATH = f.name
+
+    try:
+        queue_db.init_db()
+        assert queue_db.get_queue_stats()["queued"] == 0
+        # A write from outside queue_db is not seen until the TTL expires
+        conn = sqlite3.connect(queue_db.DB_PATH)
+        conn.execute(
+            "INSERT INTO upload_queue (source_tab, sheet_row, row_id, created_at, updated_at) "
+            "VALUES ('source__test', 2, 1, 'x', 'x')"
+        )
+        conn.commit()
+        conn.close()
+        assert queue_db.get_queue_stats()["queued"] == 0
+        # queue_db's own writers drop the cached copy
+        queue_db.enqueue("source__test", 3, 2)
+        assert queue_db.get_queue_stats()["queued"] == 2
+        print("  PASS: Queue stats cache + invalidation")
+    finally:
+        queue_db._STATS_CACHE.clear()
+        os.unlink(queue_db.DB_PATH)
+        queue_db.DB_PATH = original_path
+
+
+def test_cleanup_old_records():
+    """Test retention cleanup of old jobs, uploads and quota rows."""
+    import queue_db
+    original_path = queue_db.DB_PATH
+    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
+        queue_db.DB_PATH = f.name
+
+    try:
+        queue_db.init_db()
+        old = "2000-01-01T00:00:00+00:00"
+        conn = sqlite3.connect(queue_db.DB_PATH)
+        conn.execute(
+            "INSERT INTO upload_queue (source_tab, sheet_row, row_id, status, created_at, updated_at) "
+            "VALUES ('source__test', 2, 1, 'COMPLETED', ?, ?)", (old, old),
+        )
+        conn.execute(
+            "INSERT INTO daily_uploads (dest_account_id, upload_date, row_id, uploaded_at) "
+            "VALUES ('yt_123', '2000-01-01', 1, ?)", (old,),
+        )
+        conn.execute(
+            "INSERT INTO youtube_quota (project_id, quota_date, units_used, updated_at) "
+            "VALUES ('proj_test', '2000-01-01', 1600, ?)", (old,),
+        )
+        conn.commit()
+        conn.close()
+        queue_db.enqueue("source__test", 3, 2)
+        queue_db.record_quota_usage("proj_test", 1600)
+
+        assert queue_db.cleanup_old_records(days=90) == 3
+        assert queue_db.get_queue_stats()["queued"] == 1
+        assert queue_db.get_quota_remaining("proj_test") == queue_db._quota_limit() - 1600
+        print("  PASS: Cleanup of old records")
+    finally:
+        os.unlink(queue_db.DB_PATH)
+        queue_db.DB_PATH = original_path
+
+
 def test_daily_cap_tracking():
     """Test daily upload cap enforcement."""
     import queue_db
@@ -312,6 +461,195 @@ def test_oauth_credentials_store():
         oauth_helper.scheduler_config.CREDENTIALS_FILE = original
 
 
+def test_oauth_credentials_cache():
+    """Cached credential reads stay private copies and see external writes."""
+    import oauth_helper
+    original = oauth_helper.scheduler_config.CREDENTIALS_FILE
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False, mode="w") as f:
+        json.dump({"accounts": {}, "oauth_states": {}}, f)
+        oauth_helper.scheduler_config.CREDENTIALS_FILE = type(original)(f.name)
+
+    try:
+        oauth_helper.save_account("yt_test", {"platform": "youtube", "token_valid": True})
+        acc = oauth_helper.get_account("yt_test")
+        acc["token_valid"] = False
+        assert oauth_helper.get_account("yt_test")["token_valid"] is True
+
+        # Another process rewrites the file behind our back
+        with open(f.name, "w") as out:
+            json.dump({"accounts": {"ig_test": {"platform": "instagram"}}, "oauth_states": {}}, out)
+        assert oauth_helper.get_account("yt_test") is None
+        assert oauth_helper.get_account("ig_test")["platform"] == "instagram"
+        print("  PASS: OAuth credential cache")
+    finally:
+        os.unlink(str(oauth_helper.scheduler_config.CREDENTIALS_FILE))
+        oauth_helper.scheduler_config.CREDENTIALS_FILE = original
+
+
+def test_oauth_refresh_all_batched():
+    """refresh_all_tokens applies every result in one credentials write."""
+    import oauth_helper
+    original = oauth_helper.scheduler_config.CREDENTIALS_FILE
+    original_refreshers = dict(oauth_helper._REFRESHERS)
+    original_save = oauth_helper._save_credentials
+    original_append = oauth_helper._append_wal
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False, mode="w") as f:
+        json.dump({"accounts": {
+            "yt_ok": {"platform": "youtube", "token_valid": True, "access_token": "old"},
+            "yt_bad": {"platform": "youtube", "token_valid": True},
+            "ig_ok": {"platform": "instagram", "token_valid": True, "access_token": "old"},
+            "ig_off": {"platform": "instagram", "token_valid": False, "access_token": "old"},
+        }, "oauth_states": {}}, f)
+        oauth_helper.scheduler_config.CREDENTIALS_FILE = type(original)(f.name)
+
+    def fake_refresh(account):
+        if "access_token" not in account:
+            return None, "no_refresh_token"
+        return {"access_token": "new", "token_valid": True}, ""
+
+    saves = []
+    def counting_save(data):
+        saves.append(1)
+        original_save(data)
+
+    def counting_append(*args):
+        saves.append(1)
+        original_append(*args)
+
+    try:
+        oauth_helper._REFRESHERS["youtube"] = fake_refresh
+        oauth_helper._REFRESHERS["instagram"] = fake_refresh
+        oauth_helper._save_credentials = counting_save
+        oauth_helper._append_wal = counting_append
+        oauth_helper.refresh_all_tokens()
+        assert len(saves) == 1
+        assert oauth_helper.get_account("yt_ok")["access_token"] == "new"
+        assert oauth_helper.get_account("ig_ok")["access_token"] == "new"
+        assert oauth_helper.get_account("ig_off")["access_token"] == "old"
+        bad = oauth_helper.get_account("yt_bad")
+        assert bad["token_valid"] is False
+        assert bad["invalid_reason"] == "no_refresh_token"
+        print("  PASS: OAuth refresh_all_tokens batched commit")
+    finally:
+        oauth_helper._REFRESHERS.update(original_refreshers)
+        oauth_helper._save_credentials = original_save
+        oauth_helper._append_wal = original_append
+        os.unlink(str(oauth_helper.scheduler_config.CREDENTIALS_FILE))
+        oauth_helper.scheduler_config.CREDENTIALS_FILE = original
+
+
+def test_oauth_credentials_wal():
+    """Account mutations append to the log and replay on a cold load."""
+    import oauth_helper
+    original = oauth_helper.scheduler_config.CREDENTIALS_FILE
+    tmpdir = tempfile.mkdtemp()
+    oauth_helper.scheduler_config.CREDENTIALS_FILE = type(original)(os.path.join(tmpdir, "creds.json"))
+    cred_path = oauth_helper.scheduler_config.CREDENTIALS_FILE
+    wal_path = oauth_helper._wal_path()
+
+    try:
+        oauth_helper.save_account("yt_a", {"platform": "youtube", "token_valid": True})
+        snapshot_ino = os.stat(cred_path).st_ino
+        oauth_helper.save_account("yt_b", {"platform": "youtube", "token_valid": True})
+        oauth_helper.mark_account_invalid("yt_a", "gone")
+        oauth_helper.remove_account("yt_b")
+        assert os.stat(cred_path).st_ino == snapshot_ino  # appended, not rewritten
+
+        oauth_helper._CRED_CACHE["entry"] = (None, b"", None)
+        assert oauth_helper.get_account("yt_a")["invalid_reason"] == "gone"
+        assert oauth_helper.get_account("yt_b") is None
+
+        # A torn append is ignored, and the next commit compacts past it
+        with open(wal_path, "ab") as out:
+            out.write(b'{"set":{"yt_c"')
+        oauth_helper._CRED_CACHE["entry"] = (None, b"", None)
+        assert oauth_helper.get_account("yt_c") is None
+        oauth_helper.save_account("yt_d", {"platform": "youtube"})
+        assert os.stat(cred_path).st_ino != snapshot_ino
+        oauth_helper._CRED_CACHE["entry"] = (None, b"", None)
+        assert {a["account_id"] for a in oauth_helper.get_all_accounts()} == {"yt_a", "yt_d"}
+        print("  PASS: OAuth credentials write-ahead log")
+    finally:
+        for name in os.listdir(tmpdir):
+            os.unlink(os.path.join(tmpdir, name))
+        os.rmdir(tmpdir)
+        oauth_helper.scheduler_config.CREDENTIALS_FILE = original
+
+
+def test_oauth_credentials_restore():
+    """Credentials copied to a new directory (as a backup restore does) keep every account."""
+    import oauth_helper
+    original = oauth_helper.scheduler_config.CREDENTIALS_FILE
+    src_dir, dst_dir = tempfile.mkdtemp(), tempfile.mkdtemp()
+    oauth_helper.scheduler_config.CREDENTIALS_FILE = type(original)(os.path.join(src_dir, "creds.json"))
+
+    try:
+        oauth_helper.save_account("yt_a", {"platform": "youtube"})
+        oauth_helper.save_account("yt_b", {"platform": "youtube"})  # lives only in the log
+        _, state = oauth_helper.generate_youtube_oauth_url()
+        names = ["creds.json", "creds.wal", "creds.states.jsonl"]
+        for name in names:
+            shutil.copy(os.path.join(src_dir, name), os.path.join(dst_dir, name))
+
+        oauth_helper.scheduler_config.CREDENTIALS_FILE = type(original)(os.path.join(dst_dir, "creds.json"))
+        oauth_helper._CRED_CACHE["entry"] = (None, b"", None)
+        assert {a["account_id"] for a in oauth_helper.get_all_accounts()} == {"yt_a", "yt_b"}
+        assert oauth_helper._has_oauth_state(state)
+
+        # After compaction the snapshot alone is enough
+        oauth_helper.compact_credentials()
+        os.unlink(os.path.join(dst_dir, "creds.wal"))
+        oauth_helper._CRED_CACHE["entry"] = (None, b"", None)
+        assert {a["account_id"] for a in oauth_helper.get_all_accounts()} == {"yt_a", "yt_b"}
+        print("  PASS: OAuth credentials survive a copy to a new directory")
+    finally:
+        for d in (src_dir, dst_dir):
+            shutil.rmtree(d)
+        oauth_helper.scheduler_config.CREDENTIALS_FILE = original
+
+
+def test_oauth_state_log():
+    """OAuth states are appended to their own file and consumed atomically."""
+    import oauth_helper
+    original = oauth_helper.scheduler_config.CREDENTIALS_FILE
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False, mode="w") as f:
+        legacy = {"platform": "youtube", "created_at": datetime.now().astimezone().isoformat()}
+        json.dump({"accounts": {}, "oauth_states": {"legacy": legacy}}, f)
+        oauth_helper.scheduler_config.CREDENTIALS_FILE = type(original)(f.name)
+    states_path = oauth_helper._states_path()
+
+    try:
+        before = os.stat(f.name).st_mtime_ns
+        _, s1 = oauth_helper.generate_youtube_oauth_url()
+        _, s2 = oauth_helper.generate_instagram_oauth_url()
+        assert os.stat(f.name).st_mtime_ns == before  # credentials untouched
+        assert oauth_helper._has_oauth_state(s1)
+        assert oauth_helper._has_oauth_state(s2)
+        assert oauth_helper._has_oauth_state("legacy")
+        assert not oauth_helper._has_oauth_state("bogus")
+
+        # Consuming appends a tombstone; expired states are never valid
+        with open(states_path, "a") as out:
+            out.write(json.dumps({"state": "old", "platform": "youtube",
+                                  "created_at": "2000-01-01T00:00:00+00:00"}) + "\n")
+        oauth_helper._consume_oauth_state(s1)
+        assert not oauth_helper._has_oauth_state(s1)
+        assert not oauth_helper._has_oauth_state("old")
+        assert oauth_helper._has_oauth_state(s2)
+
+        # GC compacts both out of the file, keeping the live state
+        oauth_helper._gc_oauth_states()
+        with open(states_path, "rb") as f:
+            assert f.read().count(b"\n") == 1
+        assert oauth_helper._has_oauth_state(s2)
+        print("  PASS: OAuth state log (append/consume/expire/gc)")
+    finally:
+        os.unlink(str(oauth_helper.scheduler_config.CREDENTIALS_FILE))
+        if states_path.exists():
+            states_path.unlink()
+        oauth_helper.scheduler_config.CREDENTIALS_FILE = original
+
+
 def test_upload_result():
     """Test UploadResult standardized structure."""
     from uploader import UploadResult
@@ -366,6 +704,67 @@ def test_ffmpeg_validation():
     print("  PASS: FFmpeg validation (missing file)")
 
 
+def test_ffmpeg_probe_cache():
+    """Test one ffprobe call serves duration and dimensions per file version."""
+    import ffmpeg_worker
+    calls = []
+
+    class _Proc:
+        returncode = 0
+        stdout = '{"streams": [{"width": 720, "height": 1280}], "format": {"duration": "12.5"}}'
+
+    def fake_run(cmd, **kwargs):
+        calls.append(cmd)
+        return _Proc()
+
+    original = ffmpeg_worker.subprocess.run
+    ffmpeg_worker.subprocess.run = fake_run
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as f:
+        f.write(b"x")
+    try:
+        assert ffmpeg_worker.get_video_duration(f.name) == 12.5
+        assert ffmpeg_worker.get_video_dimensions(f.name) == (720, 1280)
+        assert len(calls) == 1
+        with open(f.name, "ab") as fh:
+            fh.write(b"more")
+        ffmpeg_worker.get_video_duration(f.name)
+        assert len(calls) == 2
+        print("  PASS: FFprobe single call + per-version cache")
+    finally:
+        ffmpeg_worker.subprocess.run = original
+        os.unlink(f.name)
+
+
+def test_ffmpeg_concat_target():
+    """Test branding clips must agree on H.264 profile/level to be matched."""
+    import ffmpeg_worker
+    from fractions import Fraction
+    audio = ("aac", 48000, 2)
+    main31 = ("h264", "Main", 31, "yuv420p", Fraction(30), 720, 1280, audio)
+    params = {}
+    original = ffmpeg_worker._clip_params
+    ffmpeg_worker._clip_params = params.get
+    with tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as intro, \
+            tempfile.NamedTemporaryFile(suffix=".mp4", delete=False) as outro:
+        pass
+    try:
+        params.update({intro.name: main31, outro.name: main31})
+        assert ffmpeg_worker._concat_target(intro.name, outro.name) == main31
+        assert ffmpeg_worker._conform_video_args(main31) == ["-profile:v", "main", "-level", "3.1"]
+
+        params[outro.name] = ("h264", "High", 31) + main31[3:]
+        assert ffmpeg_worker._concat_target(intro.name, outro.name) is None
+        params[outro.name] = ("h264", "Main", 40) + main31[3:]
+        assert ffmpeg_worker._concat_target(intro.name, outro.name) is None
+        params[intro.name] = params[outro.name] = ("h264", "Extended", 31) + main31[3:]
+        assert ffmpeg_worker._concat_target(intro.name, outro.name) is None
+        print("  PASS: FFmpeg concat target (H.264 profile/level)")
+    finally:
+        ffmpeg_worker._clip_params = original
+        os.unlink(intro.name)
+        os.unlink(outro.name)
+
+
 def test_download_disk_check():
     """Test disk space check."""
     from download_manager import check_disk_space
@@ -465,6 +864,31 @@ def test_quota_tracking():
         queue_db.DB_PATH = original_path
 
 
+def test_quota_batch_and_cheapest():
+    """Test batched quota lookup and its invalidation on new usage."""
+    import queue_db
+    import scheduler_config
+    original_path = queue_db.DB_PATH
+    original_keys = scheduler_config.YT_PROJECT_KEYS
+    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
+        queue_db.DB_PATH = f.name
+    try:
+        queue_db.init_db()
+        scheduler_config.YT_PROJECT_KEYS = {"p1": "k1", "p2": "k2"}
+        assert queue_db.get_cheapest_project() == "p1"
+        queue_db.record_quota_usage("p1", 1600)
+        remaining = queue_db.get_quota_remaining_batch(["p1", "p2"])
+        assert remaining["p1"] == queue_db.get_quota_remaining("p1")
+        assert remaining["p2"] == remaining["p1"] + 1600
+        assert queue_db.get_cheapest_project() == "p2"
+        print("  PASS: Batched quota lookup + cheapest project")
+    finally:
+        scheduler_config.YT_PROJECT_KEYS = original_keys
+        queue_db._QUOTA_CACHE.clear()
+        os.unlink(queue_db.DB_PATH)
+        queue_db.DB_PATH = original_path
+
+
 def test_key_health_monitoring():
     """Test Scrapingdog key health rotation with auto-disable."""
     import scraper_config
@@ -647,12 +1071,37 @@ def test_idempotency_keys():
         assert queue_db.check_idempotency("key123"), "Should exist after record"
         # Duplicate insert should not error
         queue_db.record_idempotency("key123", 2)
+        # Atomic claim reports whether the key was new
+        assert queue_db.claim_idempotency("key456", 3)
+        assert not queue_db.claim_idempotency("key456", 4)
         print("  PASS: Idempotency key check/record")
     finally:
         os.unlink(queue_db.DB_PATH)
         queue_db.DB_PATH = original_path
 
 
+def test_finalize_upload():
+    """Test completion, daily cap and idempotency recorded together."""
+    import queue_db
+    original_path = queue_db.DB_PATH
+    with tempfile.NamedTemporaryFile(suffix=".db", delete=False) as f:
+        queue_db.DB_PATH = f.name
+    try:
+        queue_db.init_db()
+        queue_db.enqueue("tab_a", 2, 7, dest_account_id="yt_1")
+        job_id = queue_db.get_next_jobs(1)[0]["id"]
+        queue_db.mark_in_progress(job_id)
+        assert queue_db.finalize_upload(job_id, "yt_1", 7, "idem_7")
+        assert queue_db.get_queue_stats()["completed"] == 1
+        assert queue_db.get_uploads_today("yt_1") == 1
+        assert queue_db.get_last_upload_time("yt_1") is not None
+        assert queue_db.check_idempotency("idem_7")
+        print("  PASS: Finalize upload in one transaction")
+    finally:
+        os.unlink(queue_db.DB_PATH)
+        queue_db.DB_PATH = original_path
+
+
 def test_error_classification():
     """Test UploadResult error_type field."""
     sys.modules.setdefault('google.oauth2', type(sys)('google.oauth2'))
@@ -776,21 +1225,34 @@ if __name__ == "__main__":
         test_queue_db_init,
         test_queue_enqueue_and_get,
         test_queue_lifecycle,
+        test_queue_enqueue_many,
+        test_queue_claim_next_jobs,
         test_queue_retry_backoff,
+        test_admin_snapshot,
+        test_queue_stats_cache,
+        test_cleanup_old_records,
         test_daily_cap_tracking,
         test_upload_spacing,
         test_destination_cleanup_enqueue_idempotent,
         test_destination_cleanup_lifecycle,
         test_oauth_credentials_store,
+        test_oauth_credentials_cache,
+        test_oauth_refresh_all_batched,
+        test_oauth_credentials_wal,
+        test_oauth_credentials_restore,
+        test_oauth_state_log,
         test_upload_result,
         test_uploader_factory,
         test_ffmpeg_validation,
+        test_ffmpeg_probe_cache,
+        test_ffmpeg_concat_target,
         test_download_disk_check,
         test_queue_stats,
         # Hardening tests
         test_hardening_config,
         test_youtube_quota_table,
         test_quota_tracking,
+        test_quota_batch_and_cheapest,
         test_key_health_monitoring,
         test_branding_config,
         test_ig_mode_check_exists,
@@ -799,6 +1261,7 @@ if __name__ == "__main__":
         test_sheet_archiver_import,
         # Stabilization tests
         test_idempotency_keys,
+        test_finalize_upload,
         test_error_classification,
         test_graceful_shutdown_event,
         test_health_command_exists,
@@ -33,6 +33,46 @@ def test_compute_file_hash():
     print("  PASS: File hash (full)")
 
 
+def test_hash_algo_fallback():
+    """Test a missing HASH_ALGO package falls back to untagged SHA256."""
+    import hash_utils
+    import scraper_config
+
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as f:
+        f.write(b"algo fallback")
+        path = f.name
+    original = (scraper_config.HASH_ALGO, hash_utils.blake3)
+    scraper_config.HASH_ALGO, hash_utils.blake3 = "blake3", None
+    hash_utils._resolve_algo.cache_clear()
+    try:
+        got_hash, method = hash_utils.compute_file_hash(path)
+        assert got_hash == hashlib.sha256(b"algo fallback").hexdigest()
+        assert method == "full"
+        print("  PASS: Hash algo fallback (blake3 missing -> sha256)")
+    finally:
+        scraper_config.HASH_ALGO, hash_utils.blake3 = original
+        hash_utils._resolve_algo.cache_clear()
+        os.unlink(path)
+
+
+def test_compute_file_hashes_batch():
+    """Test batch hashing matches per-file hashing, in order."""
+    from hash_utils import compute_file_hash, compute_file_hashes_batch
+
+    paths = []
+    for i in range(5):
+        with tempfile.NamedTemporaryFile(delete=False, suffix=".mp4") as f:
+            f.write(f"video {i}".encode() * (i + 1))
+            paths.append(f.name)
+    try:
+        assert compute_file_hashes_batch(paths) == [compute_file_hash(p) for p in paths]
+        assert compute_file_hashes_batch([]) == []
+        print("  PASS: File hash batch (thread pool, ordered)")
+    finally:
+        for p in paths:
+            os.unlink(p)
+
+
 def test_metadata_hash():
     """Test metadata-based hash."""
     from hash_utils import compute_metadata_hash
@@ -170,6 +210,8 @@ def test_sources_yaml():
 if __name__ == "__main__":
     tests = [
         test_compute_file_hash,
+        test_hash_algo_fallback,
+        test_compute_file_hashes_batch,
         test_metadata_hash,
         test_normalize_youtube_urls,
         test_normalize_instagram_urls,
@@ -140,6 +140,117 @@ def test_user_message_builder():
     print("  PASS: User message builder works")
 
 
+def test_schema_fast_path_and_coercion():
+    """Clean responses pass the strict pydantic AIResponse fast path; numeric strings still coerce."""
+    import json
+    import ai_agent
+    assert ai_agent._passes_schema(_make_base())
+    parsed = ai_agent._parse_validated(json.dumps({**_make_base(), "extra": 1}))
+    assert parsed is not None and parsed["extra"] == 1
+    data = _make_base()
+    data["priority_score"] = "88"
+    is_valid, issues = validate_response(data)
+    assert is_valid, issues
+    assert data["priority_score"] == 88
+    print("  PASS: Schema fast path and int coercion")
+
+
+def test_process_rows_bounded_concurrency():
+    """process_rows keeps input order, caps in-flight calls, returns errors inline."""
+    import asyncio
+    import ai_agent
+
+    in_flight = 0
+    peak = 0
+
+    async def fake_process_row_async(row):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if row["row_id"] == 3:
+            raise ValueError("bad row")
+        return {"row_id": row["row_id"]}
+
+    original = ai_agent.process_row_async
+    ai_agent.process_row_async = fake_process_row_async
+    try:
+        rows = [{"row_id": i} for i in range(6)]
+        results = asyncio.run(ai_agent.process_rows(rows, concurrency=2))
+    finally:
+        ai_agent.process_row_async = original
+
+    assert peak == 2
+    assert isinstance(results[3], ValueError)
+    assert [r["row_id"] for i, r in enumerate(results) if i != 3] == [0, 1, 2, 4, 5]
+    print("  PASS: process_rows bounded concurrency")
+
+
+def test_response_cache_roundtrip():
+    """Cached results are keyed by content hash + title and re-tagged with row_id."""
+    import tempfile
+    from pathlib import Path
+    import ai_agent
+    import config
+
+    original_db = config.AI_CACHE_DB
+    with tempfile.TemporaryDirectory() as tmp:
+        config.AI_CACHE_DB = Path(tmp) / "ai_cache.db"
+        ai_agent._RESPONSE_CACHE_READY = False
+        try:
+            row = {"row_id": "7", "content_hash": "sha256:abc", "original_title": "Clip"}
+            assert ai_agent._response_cache_get(row) is None
+            ai_agent._response_cache_set(row, _make_base())
+
+            hit = ai_agent._response_cache_get({**row, "row_id": "9"})
+            assert hit is not None
+            assert hit["ai_title"] == _make_base()["ai_title"]
+            assert hit["row_id"] == 9
+
+            assert ai_agent._response_cache_get({**row, "original_title": "Other"}) is None
+            assert ai_agent._response_cache_key({"row_id": "1"}) is None
+        finally:
+            config.AI_CACHE_DB = original_db
+            ai_agent._RESPONSE_CACHE_READY = False
+    print("  PASS: Response cache roundtrip")
+
+
+def test_context_cache_retry():
+    """Transient cache creation errors back off and retry; InvalidArgument disables caching."""
+    from google.api_core import exceptions as google_exceptions
+    import ai_agent
+    import config
+
+    errors = [google_exceptions.ServiceUnavailable("down"), google_exceptions.InvalidArgument("too small")]
+    calls = []
+
+    def fake_create(**kwargs):
+        calls.append(kwargs)
+        raise errors[len(calls) - 1]
+
+    original_create = ai_agent.genai.caching.CachedContent.create
+    original_flag = config.GEMINI_CONTEXT_CACHE
+    ai_agent.genai.caching.CachedContent.create = fake_create
+    config.GEMINI_CONTEXT_CACHE = True
+    try:
+        assert ai_agent._get_cached_system() is None
+        assert not ai_agent._CACHE_UNAVAILABLE
+        assert ai_agent._get_cached_system() is None
+        assert len(calls) == 1  # still backing off
+
+        ai_agent._CACHE_RETRY_AT = 0.0
+        assert ai_agent._get_cached_system() is None
+        assert ai_agent._CACHE_UNAVAILABLE
+        assert len(calls) == 2
+    finally:
+        ai_agent.genai.caching.CachedContent.create = original_create
+        config.GEMINI_CONTEXT_CACHE = original_flag
+        ai_agent._CACHE_UNAVAILABLE = False
+        ai_agent._CACHE_RETRY_AT = 0.0
+    print("  PASS: Context cache retry after transient errors")
+
+
 def _make_base():
     """Return a minimal valid response dict for modification."""
     return {
@@ -183,6 +294,10 @@ if __name__ == "__main__":
         test_priority_out_of_range,
         test_missing_field,
         test_user_message_builder,
+        test_schema_fast_path_and_coercion,
+        test_process_rows_bounded_concurrency,
+        test_response_cache_roundtrip,
+        test_context_cache_retry,
     ]
     print(f"Running {len(tests)} validation tests...\n")
     passed = 0